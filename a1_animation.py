@@ -0,0 +1,123 @@
+"""
+Time-based sprite animation for A1.
+
+Character.get_next_sprite() moves an animation forward one frame each time
+it is called, so animations play faster the more often the UI draws. The
+AnimationController here instead picks a character's frame from how long
+its current animation has been running, so the frame rate can change
+without changing how fast characters move.
+
+Frames are identified by integer handles: indices into FRAME_NAMES, which
+the renderer can use to index a preloaded frame table directly.
+"""
+from a1_rules import RULES
+
+ANIMATIONS = ['idle', 'attack', 'special']
+FRAMES_PER_ANIMATION = 10
+
+# How long each frame of an animation is shown, in milliseconds
+FRAME_DURATION = 100
+
+# The sprite names with frame handles, in handle order: those of every class
+# in a1_rules.RULES, and any added with add_sprite()
+SPRITE_NAMES = []
+
+# Every frame of every animation, e.g. 'mage_idle_0'. A frame handle is an
+# index into this list.
+FRAME_NAMES = []
+
+# Maps (sprite, animation, frame number) to a frame handle
+FRAME_HANDLES = {}
+
+
+def add_sprite(sprite: str) -> None:
+    """
+    Give every frame of sprite a handle, after those of the sprites already
+    added, unless it has them already. Sprite caches made before a sprite
+    is added don't hold its frames.
+
+    >>> add_sprite('mage')
+    >>> SPRITE_NAMES
+    ['mage', 'rogue']
+    """
+    if sprite in SPRITE_NAMES:
+        return
+    SPRITE_NAMES.append(sprite)
+    for animation in ANIMATIONS:
+        for n in range(FRAMES_PER_ANIMATION):
+            FRAME_HANDLES[(sprite, animation, n)] = len(FRAME_NAMES)
+            FRAME_NAMES.append('{0}_{1}_{2}'.format(sprite, animation, n))
+
+
+for _rules in RULES.values():
+    add_sprite(_rules.sprite)
+
+
+def frame_handle(sprite: str, animation: str, n: int) -> int:
+    """
+    Return the handle of frame n of sprite's animation.
+
+    >>> frame_handle('mage', 'idle', 0)
+    0
+    >>> FRAME_NAMES[frame_handle('rogue', 'special', 3)]
+    'rogue_special_3'
+    """
+    return FRAME_HANDLES[(sprite, animation, n)]
+
+
+class AnimationController:
+    """
+    Chooses each character's current frame from elapsed time.
+
+    frame_duration - how long each frame is shown, in milliseconds
+    """
+    frame_duration: float
+
+    def __init__(self, frame_duration: float = FRAME_DURATION) -> None:
+        """
+        Initialize this AnimationController.
+        """
+        self.frame_duration = frame_duration
+
+    def frame(self, character: 'Character', now: float) -> int:
+        """
+        Return the handle of the frame character should show at time now
+        (in milliseconds), and record it in character.last_animation.
+
+        An attack restarts the character's animation by setting
+        last_animation to (animation, -1); the animation is then timed from
+        the first call after that. Attack and special animations play once
+        and are followed by the looping idle animation.
+
+        >>> from a1_battle_queue import BattleQueue
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> from a1_characters import Mage
+        >>> bq = BattleQueue()
+        >>> x = Mage('adam', bq, ManualPlaystyle(bq))
+        >>> controller = AnimationController(100)
+        >>> FRAME_NAMES[controller.frame(x, 0)]
+        'mage_idle_0'
+        >>> FRAME_NAMES[controller.frame(x, 250)]
+        'mage_idle_2'
+        >>> x.last_animation = ('attack', -1)
+        >>> FRAME_NAMES[controller.frame(x, 300)]
+        'mage_attack_0'
+        >>> FRAME_NAMES[controller.frame(x, 1350)]
+        'mage_idle_0'
+        """
+        animation, number = character.last_animation
+        if number == -1 or character.animation_start is None:
+            character.animation_start = now
+
+        elapsed = int((now - character.animation_start) //
+                      self.frame_duration)
+        if animation != 'idle' and elapsed >= FRAMES_PER_ANIMATION:
+            # The attack has finished playing; idle from when it ended
+            animation = 'idle'
+            character.animation_start += \
+                FRAMES_PER_ANIMATION * self.frame_duration
+            elapsed -= FRAMES_PER_ANIMATION
+
+        number = elapsed % FRAMES_PER_ANIMATION
+        character.last_animation = (animation, number)
+        return FRAME_HANDLES[(character.sprite, animation, number)]
@@ -16,11 +16,17 @@ the constructors for the docstring examples.
 # If there are multiple return types, import Union and use that. For example:
 # Union[str, bool]
 
-from typing import Union
+from collections import deque
+from typing import List, Union
 
 class BattleQueue:
     """
     A class representing a BattleQueue.
+    
+    Turns are stored as runs: consecutive turns by the same character are
+    collapsed into a single [character, count] entry of a deque, so adding
+    and removing are O(1) and a character that acts several times in a row
+    (e.g. after a Rogue's special attack) only takes up one entry.
     """
         
     def __init__(self) -> None:
@@ -31,9 +37,58 @@ class BattleQueue:
         >>> bq.is_empty()
         True
         """
-        self.queue = []
+        self._runs = deque()
+        self._size = 0
+        
+        # Game-over state, kept up to date by the characters as they act
+        # (see character_defeated and character_exhausted) so that is_over
+        # and get_winner never have to scan the queue
+        self._players = {}
+        self._exhausted = set()
+        self._over = False
+        self._winner = None
+        
+    @property
+    def queue(self) -> List['Character']:
+        """
+        Return a list of every turn in this BattleQueue, front first.
+        
+        This expands the runs, so it takes time proportional to the length
+        of the queue. It is meant for inspection, not for the game loop.
+        
+        >>> bq = BattleQueue()
+        >>> bq.queue
+        []
+        """
+        return [character for character, count in self._runs 
+                for _ in range(count)]
         
+    def __len__(self) -> int:
+        """
+        Return the number of turns in this BattleQueue.
         
+        >>> len(BattleQueue())
+        0
+        """
+        return self._size
+
+    def head(self, count: int) -> List['Character']:
+        """
+        Return the first count turns in this BattleQueue, front first (or
+        every turn if there are fewer). This only looks at as many runs as
+        it needs to.
+
+        >>> bq = BattleQueue()
+        >>> bq.head(3)
+        []
+        """
+        turns = []
+        for character, run_length in self._runs:
+            if len(turns) >= count:
+                break
+            turns.extend([character] * min(run_length, count - len(turns)))
+        return turns
+
     def first_player_with_action(self) -> 'Character':
         '''Return the first player in the queue that has an ability they 
         can perform.
@@ -50,11 +105,9 @@ class BattleQueue:
         >>> bq.is_empty()
         False'''
         
-        #return self.queue[0]
-        try:
-            return self.queue[0]
-        except:
-            return None
+        if self._runs:
+            return self._runs[0][0]
+        return None
 
             
     def add(self, character: 'Character') -> None:
@@ -70,7 +123,14 @@ class BattleQueue:
         >>> bq.is_empty()
         False
         """
-        self.queue.append(character)
+        if character not in self._players:
+            self._players[character] = None
+            
+        if self._runs and self._runs[-1][0] is character:
+            self._runs[-1][1] += 1
+        else:
+            self._runs.append([character, 1])
+        self._size += 1
         
     
     def remove(self) -> 'Character':
@@ -87,11 +147,15 @@ class BattleQueue:
         >>> bq.is_empty()
         True
         """
-        temp = self.first_player_with_action()
-        if temp != None:
-            self.queue.remove(temp)
-            return temp
-        return None
+        if not self._runs:
+            return None
+        
+        run = self._runs[0]
+        run[1] -= 1
+        if run[1] == 0:
+            self._runs.popleft()
+        self._size -= 1
+        return run[0]
         
     def is_empty(self) -> bool:
         """
@@ -120,10 +184,7 @@ class BattleQueue:
         >>> bq.is_empty()
         False
         """
-        temp = self.first_player_with_action()
-        if self.first_player_with_action() != None:    
-            return self.first_player_with_action()     
-        return temp
+        return self.first_player_with_action()
         
     
     def is_over(self) -> bool:
@@ -147,15 +208,54 @@ class BattleQueue:
         >>> bq.is_over()
         False
         """
-        if self.is_empty():
-            return True
+        return self._over or not self._runs
+        
+    def character_defeated(self, character: 'Character') -> None:
+        """
+        Record that character's HP has reached 0, ending the game. The winner
+        is the first other player in this BattleQueue with HP left.
+        
+        >>> bq = BattleQueue()
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> from a1_characters import Rogue
+        >>> x = Rogue('adam', bq, ManualPlaystyle(bq))
+        >>> y = Rogue('mike', bq, ManualPlaystyle(bq))
+        >>> bq.add(x)
+        >>> bq.add(y)
+        >>> y.health = 0
+        >>> bq.character_defeated(y)
+        >>> bq.get_winner() is x
+        True
+        """
+        if self._over:
+            return
         
-        for player in self.queue:
-            if player.health == 0:
-                return True
-        return False
+        self._over = True
+        for player in self._players:
+            if player is not character and player.health != 0:
+                self._winner = player
+                return
         
+    def character_exhausted(self, character: 'Character') -> None:
+        """
+        Record that character has no skills left that it can use. Once every
+        player in this BattleQueue is exhausted, the game ends in a tie.
+        
+        >>> bq = BattleQueue()
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> from a1_characters import Rogue
+        >>> x = Rogue('adam', bq, ManualPlaystyle(bq))
+        >>> bq.add(x)
+        >>> bq.character_exhausted(x)
+        >>> bq.is_over()
+        True
+        >>> bq.get_winner()
+        """
+        self._exhausted.add(character)
+        if len(self._exhausted) >= len(self._players):
+            self._over = True
             
+
     def get_winner(self) -> Union['Character', None]:
         """
         Return the winner of the game being carried out in this BattleQueue
@@ -166,9 +266,7 @@ class BattleQueue:
         >>> bq.get_winner()
         """
         if self.is_over():
-            for player in self.queue:
-                if player.health != 0:
-                    return player
+            return self._winner
         return None
 
 if __name__ == '__main__':
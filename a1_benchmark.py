@@ -0,0 +1,233 @@
+"""
+Benchmarks of A1's hot paths.
+
+Times the BattleQueue operations at several queue sizes, full headless
+matches for every class pairing, a1_game.perform_attack() with update_ui(),
+and one a1_ui.update_game() frame drawn offscreen with SDL's dummy video
+driver. Each result is the best of several runs, in seconds per operation.
+
+Each result is printed as soon as its benchmark finishes. Results are
+written as JSON and compared against a stored baseline; any benchmark
+slower than the baseline by more than the threshold is reported as a
+regression and makes the run exit with status 1. The frame benchmark is
+skipped if pygame or the sprites can't be loaded.
+    python a1_benchmark.py --update-baseline     # record a baseline
+    python a1_benchmark.py --threshold 0.2       # compare against it
+
+Timings depend on the machine, so baselines are not shared.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from typing import Callable, Dict
+
+# Draw frames without opening a window; must be set before pygame starts
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import a1_game
+from a1_battle_queue import BattleQueue
+from a1_playstyle import ManualPlaystyle
+from a1_simulate import MatchSpec, play_match
+
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'a1_benchmark_baseline.json')
+
+# A benchmark slower than its baseline by more than this fraction regresses
+DEFAULT_THRESHOLD = 0.2
+
+# Seconds to wait for the sprites before skipping the frame benchmark
+SPRITE_LOAD_TIMEOUT = 30
+
+QUEUE_SIZES = [10, 1000, 100000]
+REPEAT = 5
+
+
+def measure(operation: Callable[[], object], number: int,
+            repeat: int = REPEAT) -> float:
+    """
+    Return the best time of repeat runs of number calls to operation, in
+    seconds per call.
+    """
+    return min(timeit.repeat(operation, number=number, repeat=repeat)) / number
+
+
+def bench_queue(repeat: int) -> Dict[str, float]:
+    """
+    Time the BattleQueue operations at every size in QUEUE_SIZES.
+    """
+    results = {}
+    for size in QUEUE_SIZES:
+        battle_queue = BattleQueue()
+        players = [a1_game.CHARACTER_CLASSES[key](
+            key, battle_queue, ManualPlaystyle(battle_queue))
+                   for key in ('m', 'r')]
+        for i in range(size):
+            battle_queue.add(players[i % 2])
+
+        def add_remove() -> None:
+            """
+            Add a turn and take one off, keeping the queue's size.
+            """
+            battle_queue.add(players[1])
+            battle_queue.remove()
+
+        for name, operation in (('add+remove', add_remove),
+                                ('peek', battle_queue.peek),
+                                ('is_over', battle_queue.is_over),
+                                ('get_winner', battle_queue.get_winner)):
+            results['queue.{}[{}]'.format(name, size)] = measure(
+                operation, 10000, repeat)
+    return results
+
+
+def bench_matches(repeat: int) -> Dict[str, float]:
+    """
+    Time a headless Random vs Random match for every class pairing.
+    """
+    results = {}
+    for p1_class in sorted(a1_game.CHARACTER_CLASSES):
+        for p2_class in sorted(a1_game.CHARACTER_CLASSES):
+            specs = [MatchSpec(p1_class, p2_class, seed=seed)
+                     for seed in range(200)]
+            results['match[{}-{}]'.format(p1_class, p2_class)] = measure(
+                lambda: [play_match(spec) for spec in specs], 1,
+                repeat) / len(specs)
+    return results
+
+
+def _new_default_session(seed: int) -> None:
+    """
+    Make a fresh seeded Mage vs Rogue Random match the default session.
+    """
+    a1_game.set_session(a1_game.create_session('m', 'r', 'r', 'r',
+                                               seed=seed))
+
+
+def bench_turn(repeat: int) -> Dict[str, float]:
+    """
+    Time a1_game.perform_attack() followed by update_ui(), starting a new
+    match whenever one ends.
+    """
+    _new_default_session(0)
+    clock = [0]
+
+    def turn() -> None:
+        """
+        Make one move and fetch the UI parameters.
+        """
+        if a1_game.GAME_IS_OVER:
+            _new_default_session(clock[0])
+        a1_game.perform_attack()
+        clock[0] += 16
+        a1_game.update_ui(clock[0])
+
+    return {'game.perform_attack+update_ui': measure(turn, 2000, repeat)}
+
+
+def bench_frame(repeat: int) -> Dict[str, float]:
+    """
+    Time one a1_ui.update_game() frame, with full redraws and with dirty
+    rectangles, drawn offscreen. Return no results if pygame or the
+    sprites can't be loaded.
+    """
+    import a1_ui
+
+    _new_default_session(0)
+    try:
+        a1_ui.open_display()
+    except (ImportError, FileNotFoundError) as error:
+        print('Skipping the frame benchmark: {}'.format(error))
+        return {}
+    if not a1_ui.SPRITES.wait(SPRITE_LOAD_TIMEOUT):
+        print("Skipping the frame benchmark: the sprites didn't finish "
+              "loading")
+        return {}
+    results = {}
+    for name, dirty in (('full', False), ('dirty-rects', True)):
+        a1_ui.DIRTY_RECT_RENDERING = dirty
+        a1_ui.LAST_DRAWN = []
+        results['ui.update_game[{}]'.format(name)] = measure(
+            a1_ui.update_game, 200, repeat)
+    return results
+
+
+def run_benchmarks(repeat: int = REPEAT) -> Dict[str, float]:
+    """
+    Run every benchmark, printing each result as it finishes, and return
+    each one's seconds per operation.
+    """
+    results = {}
+    for bench in (bench_queue, bench_matches, bench_turn, bench_frame):
+        for name, seconds in bench(repeat).items():
+            print('{:40} {:12.3f} us'.format(name, seconds * 1e6),
+                  flush=True)
+            results[name] = seconds
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float) -> Dict[str, float]:
+    """
+    Return the benchmarks in results slower than in baseline by more than
+    threshold, mapped to how many times slower they are.
+
+    >>> compare({'a': 1.3, 'b': 1.0, 'c': 5.0}, {'a': 1.0, 'b': 1.0}, 0.2)
+    {'a': 1.3}
+    """
+    return {name: seconds / baseline[name]
+            for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + threshold)}
+
+
+def main() -> None:
+    """
+    Run the benchmarks from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark A1')
+    parser.add_argument('--output', metavar='PATH',
+                        help='write the results as JSON to PATH')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH,
+                        help='the baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='the fraction slower than the baseline that '
+                             'counts as a regression')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store these results as the baseline')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    report = {'python': platform.python_version(),
+              'machine': platform.machine(),
+              'unit': 'seconds per operation',
+              'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print('Stored the baseline in {}'.format(args.baseline))
+        return
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at {}; run with --update-baseline to store one'
+              .format(args.baseline))
+        return
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for name, ratio in sorted(regressions.items()):
+        print('REGRESSION {}: {:.2f}x the baseline'.format(name, ratio))
+    if regressions:
+        sys.exit(1)
+    print('No regressions beyond {:.0%} of the baseline'.format(
+        args.threshold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,529 @@
+"""
+A compact struct-of-arrays store of A1 combatants.
+
+Every Character is a full Python object with its own __dict__, name,
+playstyle and animation tuple, which is fine for one match but dominates
+memory when simulating millions of combatants at once. CharacterStore keeps
+each combatant's HP, SP, defense, class, enemy and animation state in typed
+arrays instead, one slot per combatant, so a combatant costs a few bytes.
+
+StoredCharacter is a view of one slot with __slots__ and the Character API
+(get_hp, get_sp, attack, special_attack, ...), so code written for
+Character objects can drive stored combatants. Views hold no game state of
+their own. The store hands out one view per combatant while that view is in
+use, so views can be compared with 'is' like Characters, and a view nothing
+refers to any more is freed.
+
+Run this file to compare the memory used per combatant:
+    python a1_character_store.py --count 1000000
+"""
+import argparse
+import gc
+import tracemalloc
+import weakref
+from array import array
+from typing import List, Union
+
+from a1_animation import ANIMATIONS
+from a1_rules import ABILITY_BITS, MASK_ACTIONS, RULES, STARTING_HP, \
+    STARTING_SP, Ability, ClassRules
+
+# Class ids are indices into these
+CLASS_KEYS = tuple(sorted(RULES))
+CLASS_RULES = tuple(RULES[key] for key in CLASS_KEYS)
+CLASS_IDS = {key: class_id for class_id, key in enumerate(CLASS_KEYS)}
+
+# Animation ids are indices into ANIMATIONS
+ANIMATION_IDS = {animation: i for i, animation in enumerate(ANIMATIONS)}
+
+# The enemy of a combatant that hasn't been paired
+NO_ENEMY = -1
+
+# The typecode of each array in a CharacterStore
+TYPECODES = {'health': 'H', 'skill_points': 'H', 'defense': 'B',
+             'class_id': 'B', 'enemy': 'i', 'animation': 'B',
+             'frame': 'b', 'animation_start': 'd'}
+
+# How many bytes of arrays each combatant takes up
+BYTES_PER_CHARACTER = sum(array(typecode).itemsize
+                          for typecode in TYPECODES.values())
+
+
+class CharacterStore:
+    """
+    Typed arrays holding many combatants, indexed by combatant.
+
+    health, skill_points, defense - each combatant's HP, SP and defense
+    class_id - the index of each combatant's class in CLASS_KEYS
+    enemy - the index of each combatant's enemy, or NO_ENEMY
+    animation, frame - each combatant's last_animation, as an index into
+                       ANIMATIONS and a frame number
+    animation_start - when each combatant's animation started, in
+                      milliseconds (NaN if it hasn't)
+    """
+    health: array
+    skill_points: array
+    defense: array
+    class_id: array
+    enemy: array
+    animation: array
+    frame: array
+    animation_start: array
+    _views: 'weakref.WeakValueDictionary'
+
+    def __init__(self) -> None:
+        """
+        Initialize this CharacterStore with no combatants.
+
+        >>> len(CharacterStore())
+        0
+        """
+        for name, typecode in TYPECODES.items():
+            setattr(self, name, array(typecode))
+        self._views = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        """
+        Return the number of combatants in this CharacterStore.
+        """
+        return len(self.health)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return how many bytes the combatants' arrays take up.
+        """
+        return sum(len(column) * column.itemsize
+                   for column in self._columns())
+
+    def _columns(self) -> List[array]:
+        """
+        Return every array in this CharacterStore.
+        """
+        return [getattr(self, name) for name in TYPECODES]
+
+    def add(self, class_key: str, count: int = 1) -> int:
+        """
+        Add count fresh combatants of the class with class_key (a key of
+        a1_rules.RULES) and return the index of the first.
+
+        >>> store = CharacterStore()
+        >>> store.add('r', 3), store.add('m')
+        (0, 3)
+        >>> len(store)
+        4
+        """
+        first = len(self)
+        class_id = CLASS_IDS[class_key]
+        self.health.extend(array('H', [STARTING_HP]) * count)
+        self.skill_points.extend(array('H', [STARTING_SP]) * count)
+        self.defense.extend(array('B', [CLASS_RULES[class_id].defense]) *
+                            count)
+        self.class_id.extend(array('B', [class_id]) * count)
+        self.enemy.extend(array('i', [NO_ENEMY]) * count)
+        self.animation.extend(array('B', [ANIMATION_IDS['idle']]) * count)
+        self.frame.extend(array('b', [9]) * count)
+        self.animation_start.extend(array('d', [float('nan')]) * count)
+        return first
+
+    def pair(self, first: int, second: int) -> None:
+        """
+        Make the combatants at first and second each other's enemy.
+        """
+        self.enemy[first] = second
+        self.enemy[second] = first
+
+    def rules(self, index: int) -> ClassRules:
+        """
+        Return the rules of the combatant at index.
+        """
+        return CLASS_RULES[self.class_id[index]]
+
+    def actions(self, index: int) -> tuple:
+        """
+        Return the moves the combatant at index can make.
+
+        >>> store = CharacterStore()
+        >>> store.actions(store.add('m'))
+        ('A', 'S')
+        """
+        return MASK_ACTIONS[self.rules(index).action_masks[
+            self.skill_points[index]]]
+
+    def perform(self, index: int, key: str) -> Ability:
+        """
+        Have the combatant at index use the ability with the given key on
+        its enemy, and return the Ability used. Adding turns to a battle
+        queue is left to the caller.
+
+        >>> store = CharacterStore()
+        >>> rogue, mage = store.add('r'), store.add('m')
+        >>> store.pair(rogue, mage)
+        >>> store.perform(rogue, 'S').queue
+        ('self', 'self')
+        >>> store.health[mage], store.skill_points[rogue]
+        (88, 90)
+        """
+        ability = self.rules(index).abilities[key]
+        enemy = self.enemy[index]
+        self.health[enemy] = max(0, self.health[enemy] - ability.damage +
+                                 self.defense[enemy])
+        self.skill_points[index] = max(0, self.skill_points[index] -
+                                       ability.cost)
+        self.animation[index] = ANIMATION_IDS[ability.animation]
+        self.frame[index] = -1
+        return ability
+
+    def character(self, index: int, name: str = None,
+                  battle_queue: 'BattleQueue' = None,
+                  playstyle: 'Playstyle' = None) -> 'StoredCharacter':
+        """
+        Return the view of the combatant at index, making one if it has none
+        in use, and give it any name, battle_queue and playstyle given.
+
+        >>> store = CharacterStore()
+        >>> store.character(store.add('m'), 'adam') is store.character(0)
+        True
+        """
+        view = self._views.get(index)
+        if view is None:
+            return StoredCharacter(self, index, name, battle_queue, playstyle)
+        if name is not None:
+            view.name = name
+        if battle_queue is not None:
+            view.battle_queue = battle_queue
+        if playstyle is not None:
+            view.playstyle = playstyle
+        return view
+
+
+class StoredCharacter:
+    """
+    A view of one combatant in a CharacterStore, with the Character API.
+
+    Two views of the same combatant are equal, but the store only hands out
+    one at a time (see CharacterStore.character); a new view replaces the
+    store's current one. A view only adds turns to a battle queue if it was
+    given one.
+
+    store - the CharacterStore holding the combatant
+    index - the combatant's index in store
+    name - the combatant's name
+    battle_queue - the BattleQueue of the combatant's match, or None
+    playstyle - the combatant's Playstyle, or None
+    """
+    __slots__ = ('store', 'index', 'name', 'battle_queue', 'playstyle',
+                 '__weakref__')
+
+    store: CharacterStore
+    index: int
+    name: str
+    battle_queue: Union['BattleQueue', None]
+    playstyle: Union['Playstyle', None]
+
+    def __init__(self, store: CharacterStore, index: int, name: str = None,
+                 battle_queue: 'BattleQueue' = None,
+                 playstyle: 'Playstyle' = None) -> None:
+        """
+        Initialize this view of the combatant at index in store.
+
+        >>> store = CharacterStore()
+        >>> x = StoredCharacter(store, store.add('r'), 'adam')
+        >>> x
+        adam: (Rogue) 100/100
+        """
+        self.store = store
+        self.index = index
+        self.name = name if name is not None else '{} {}'.format(
+            store.rules(index).name, index)
+        self.battle_queue = battle_queue
+        self.playstyle = playstyle
+        store._views[index] = self
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Return whether other is a view of the same combatant.
+        """
+        return (isinstance(other, StoredCharacter) and
+                other.store is self.store and other.index == self.index)
+
+    def __hash__(self) -> int:
+        """
+        Return a hash of the combatant this is a view of.
+        """
+        return hash((id(self.store), self.index))
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the combatant, the same as
+        Character's.
+        """
+        return '{0}: ({1}) {2}/{3}'.format(self.name, self.style,
+                                           self.health, self.skill_points)
+
+    @property
+    def rules(self) -> ClassRules:
+        """
+        Return the rules of the combatant's class.
+        """
+        return self.store.rules(self.index)
+
+    @property
+    def style(self) -> str:
+        """
+        Return the name of the combatant's class, e.g. 'Rogue'.
+        """
+        return self.rules.name
+
+    @property
+    def sprite(self) -> str:
+        """
+        Return the name the combatant's sprites start with.
+        """
+        return self.rules.sprite
+
+    @property
+    def health(self) -> int:
+        """
+        Return the combatant's HP.
+        """
+        return self.store.health[self.index]
+
+    @health.setter
+    def health(self, value: int) -> None:
+        """
+        Set the combatant's HP.
+        """
+        self.store.health[self.index] = value
+
+    @property
+    def skill_points(self) -> int:
+        """
+        Return the combatant's SP.
+        """
+        return self.store.skill_points[self.index]
+
+    @skill_points.setter
+    def skill_points(self, value: int) -> None:
+        """
+        Set the combatant's SP.
+        """
+        self.store.skill_points[self.index] = value
+
+    @property
+    def defense(self) -> int:
+        """
+        Return the combatant's defense.
+        """
+        return self.store.defense[self.index]
+
+    @property
+    def enemy(self) -> Union['StoredCharacter', None]:
+        """
+        Return the view of the combatant's enemy, or None if it hasn't been
+        paired.
+        """
+        enemy = self.store.enemy[self.index]
+        if enemy == NO_ENEMY:
+            return None
+        return self.store.character(enemy)
+
+    @enemy.setter
+    def enemy(self, other: 'StoredCharacter') -> None:
+        """
+        Make other the combatant's enemy. other must be in the same store.
+        """
+        self.store.enemy[self.index] = other.index
+
+    @property
+    def last_animation(self) -> tuple:
+        """
+        Return the combatant's (animation, frame number).
+        """
+        return (ANIMATIONS[self.store.animation[self.index]],
+                self.store.frame[self.index])
+
+    @last_animation.setter
+    def last_animation(self, value: tuple) -> None:
+        """
+        Set the combatant's (animation, frame number).
+        """
+        self.store.animation[self.index] = ANIMATION_IDS[value[0]]
+        self.store.frame[self.index] = value[1]
+
+    @property
+    def animation_start(self) -> Union[float, None]:
+        """
+        Return when the combatant's animation started, or None.
+        """
+        start = self.store.animation_start[self.index]
+        return None if start != start else start
+
+    @animation_start.setter
+    def animation_start(self, value: Union[float, None]) -> None:
+        """
+        Set when the combatant's animation started.
+        """
+        self.store.animation_start[self.index] = \
+            float('nan') if value is None else value
+
+    def get_name(self) -> str:
+        """
+        Return the name of the combatant.
+        """
+        return self.name
+
+    def get_hp(self) -> int:
+        """
+        Return how much health the combatant has left.
+        """
+        return self.store.health[self.index]
+
+    def get_sp(self) -> int:
+        """
+        Return how many skill points the combatant has left.
+        """
+        return self.store.skill_points[self.index]
+
+    def get_next_sprite(self) -> str:
+        """
+        Return the next sprite to be drawn, as Character.get_next_sprite
+        does.
+        """
+        animation, number = self.last_animation
+        if number != 9:
+            number += 1
+        else:
+            animation, number = 'idle', 0
+        self.last_animation = (animation, number)
+        return '{0}_{1}_{2}'.format(self.sprite, animation, number)
+
+    def perform(self, key: str) -> None:
+        """
+        Perform the ability with the given key, as Character.perform does.
+
+        >>> from a1_battle_queue import BattleQueue
+        >>> bq = BattleQueue()
+        >>> store = CharacterStore()
+        >>> x = store.character(store.add('m'), 'adam', bq)
+        >>> y = store.character(store.add('r'), 'mike', bq)
+        >>> x.enemy, y.enemy = y, x
+        >>> bq.add(x)
+        >>> x.perform('S')
+        >>> y.get_hp(), bq.queue[-2:] == [y, x]
+        (70, True)
+        """
+        ability = self.store.perform(self.index, key)
+        if self.battle_queue is not None:
+            enemy = self.enemy
+            for who in ability.queue:
+                self.battle_queue.add(self if who == 'self' else enemy)
+            self._report_state()
+
+    def attack(self) -> None:
+        """
+        Perform an attack.
+        """
+        self.perform('A')
+
+    def special_attack(self) -> None:
+        """
+        Perform a special attack.
+        """
+        self.perform('S')
+
+    def get_available_actions(self) -> list:
+        """
+        Return all available attacks for the combatant to perform.
+        """
+        return list(self.store.actions(self.index))
+
+    def is_valid_action(self, move: str) -> bool:
+        """
+        Return whether the combatant can perform the given action.
+        """
+        return bool(self.rules.action_masks[self.skill_points] &
+                    ABILITY_BITS.get(move, 0))
+
+    def _report_state(self) -> None:
+        """
+        Tell the battle queue if the enemy was defeated or this combatant
+        can no longer act, as Character._report_state does.
+        """
+        enemy = self.enemy
+        if enemy.health == 0:
+            self.battle_queue.character_defeated(enemy)
+        if not self.store.actions(self.index):
+            self.battle_queue.character_exhausted(self)
+
+
+def _measure(build: callable) -> int:
+    """
+    Return how many bytes stay allocated by the object build() returns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def _build_characters(count: int) -> list:
+    """
+    Return count Characters set up as GameSession sets them up, alternating
+    between the classes.
+    """
+    from a1_battle_queue import BattleQueue
+    from a1_characters import make_character_class
+    from a1_playstyle import RandomPlaystyle
+
+    classes = [make_character_class(key) for key in CLASS_KEYS]
+    battle_queue = BattleQueue()
+    return [classes[i % len(classes)]('P{}'.format(i), battle_queue,
+                                      RandomPlaystyle(battle_queue))
+            for i in range(count)]
+
+
+def _build_store(count: int) -> CharacterStore:
+    """
+    Return a CharacterStore of count combatants, alternating between the
+    classes.
+    """
+    store = CharacterStore()
+    for key in CLASS_KEYS:
+        store.add(key, count // len(CLASS_KEYS))
+    return store
+
+
+def main() -> None:
+    """
+    Report the bytes per combatant of Character objects and of a
+    CharacterStore.
+    """
+    parser = argparse.ArgumentParser(
+        description='Compare memory per A1 combatant')
+    parser.add_argument('--count', type=int, default=1000000,
+                        help='combatants to put in the store')
+    parser.add_argument('--objects', type=int, default=100000,
+                        help='Character objects to measure')
+    args = parser.parse_args()
+
+    object_bytes = _measure(lambda: _build_characters(args.objects))
+    print('Character objects: {:.1f} bytes per character ({} measured, '
+          'including playstyles)'.format(object_bytes / args.objects,
+                                         args.objects))
+
+    store_bytes = _measure(lambda: _build_store(args.count))
+    count = args.count // len(CLASS_KEYS) * len(CLASS_KEYS)
+    print('CharacterStore: {:.1f} bytes per character ({} live, {} bytes '
+          'of arrays each)'.format(store_bytes / count, count,
+                                   BYTES_PER_CHARACTER))
+
+
+if __name__ == '__main__':
+    main()
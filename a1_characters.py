@@ -1,14 +1,24 @@
-"""Contains character classes"""
+"""Contains character classes
+
+A character class is defined by its rules (see a1_rules.CLASS_DEFINITIONS).
+Character carries out every ability from the compiled rules, so Rogue and Mage
+only say which rules they play by, and further classes can be made from a
+definition alone with make_character_class."""
+
+from a1_rules import CLASS_DEFINITIONS, MASK_ACTIONS, ABILITY_BITS, \
+    ClassRules, RULES, compile_class
 
 class Character:
     """A character class
     name - character name
     battle_queue - contains information about which player will attack next
-    playstyle - character has either a manual or random playstyle"""
+    playstyle - character has either a manual or random playstyle
+    rules - the compiled rules of the character's class"""
     
     name: str
     battle_queue: 'BattleQueue'
     playstyle: 'Playstyle'
+    rules: ClassRules = None
     
     def __init__(self, name: str, battle_queue: 'BattleQueue', 
                  playstyle: 'Playstyle') -> None:
@@ -37,6 +47,11 @@ class Character:
         self.battle_queue = battle_queue
         self.style = None
         self.last_animation = ('idle', 9)
+        self.animation_start = None
+        if self.rules is not None:
+            self.defense = self.rules.defense
+            self.style = self.rules.name
+            self.sprite = self.rules.sprite
         
     def get_next_sprite(self) -> str:
         """Returns the next sprite to be drawn.
@@ -135,29 +150,41 @@ class Character:
         return '{0}: ({1}) {2}/{3}'.format(self.name, self.style,
                                            self.health, self.skill_points)
     
+    def _report_state(self) -> None:
+        """Tell the battle queue if the attack just performed defeated the
+        enemy or left this character without any actions it can perform.
+        Called at the end of every attack so the battle queue can answer
+        is_over and get_winner without scanning itself."""
+        if self.enemy.health == 0:
+            self.battle_queue.character_defeated(self.enemy)
+        if not self.get_available_actions():
+            self.battle_queue.character_exhausted(self)
     
-class Rogue(Character):
-    """A rogue type character class. Inherits from character"""
-    def __init__(self, name: str, battle_queue: 'BattleQueue', 
-                 playstyle: 'Playstlyle') -> None:
-        """Inherits from character class
+    def perform(self, key: str) -> None:
+        """Perform the ability with the given key ('A' or 'S') as described
+        by this character's rules: start its animation, deal its damage less
+        the enemy's defense, spend its SP and add its turns to the end of the
+        battle queue.
         
         >>> from a1_battle_queue import BattleQueue 
         >>> from a1_playstyle import ManualPlaystyle
         >>> bq = BattleQueue()
         >>> ps = ManualPlaystyle(bq)
-        >>> P1 = Rogue('Mike', bq, ps)
-        >>> x.battle_queue == bq
-        >>> True
-        >>> x.skill_points == 100
-        >>> True
-        >>> x.health == 100
-        >>> True"""
-        
-        super().__init__(name, battle_queue, playstyle)
-        self.defense = 10
-        self.style = 'Rogue'
-        self.sprite = 'rogue'
+        >>> x = Rogue('adam', bq, ps)
+        >>> y = Mage('mike', bq, ps)
+        >>> x.enemy, y.enemy = y, x
+        >>> x.perform('S')
+        >>> y.get_hp(), x.get_sp()
+        (88, 90)
+        """
+        ability = self.rules.abilities[key]
+        self.last_animation = (ability.animation, -1)
+        self.enemy.health = max(0, self.enemy.health - ability.damage + 
+                                self.enemy.defense)
+        self.skill_points = max(0, self.skill_points - ability.cost)
+        for who in ability.queue:
+            self.battle_queue.add(self if who == 'self' else self.enemy)
+        self._report_state()
     
     def attack(self) -> None:
         """Performs an attack. Sets animation back to the first attack 
@@ -182,16 +209,14 @@ class Rogue(Character):
         >>> bq.queue[-1]
         >>> x
         """
-        
-        self.last_animation = ('attack', -1)
-        self.enemy.health = max(0, self.enemy.health - 15 + self.enemy.defense)
-        self.skill_points = max(0, self.skill_points - 3)
-        self.battle_queue.add(self)
+        self.perform('A')
                 
     def special_attack(self) -> None:
         """Performs a special attack. Sets animation back to the first special
         attack animation. Reduces enemy's health and it's own characters skill
-        points and add's it's self to the end of the battle queue twice.
+        points and adds characters to the end of the battle queue as the
+        class's rules say (a Rogue adds it's self twice, a Mage adds the enemy
+        and then it's self).
         
         >>> from a1_battle_queue import BattleQueue 
         >>> from a1_playstyle import ManualPlaystyle
@@ -210,16 +235,11 @@ class Rogue(Character):
         >>> 'Rogue_special_0'
         >>> x.get_sp()
         >>> 90"""
-        
-        self.last_animation = ('special', -1)
-        self.enemy.health = max(0, self.enemy.health - 20 + self.enemy.defense)
-        self.skill_points = max(0, self.skill_points - 10)
-        self.battle_queue.add(self)    
-        self.battle_queue.add(self)  
+        self.perform('S')
         
     def get_available_actions(self) -> list:
         """Return all available attacks for the character to perform. Return 
-        None if the character can not perform any attacks.
+        an empty list if the character can not perform any attacks.
         
         >>> from a1_battle_queue import BattleQueue 
         >>> from a1_playstyle import ManualPlaystyle
@@ -229,11 +249,7 @@ class Rogue(Character):
         >>> x.get_available_actions()
         >>> ['A', 'S']
         """
-        if self.skill_points >= 10:
-            return ['A', 'S']
-        elif self.skill_points >= 3:
-            return ['A']
-        return []
+        return list(MASK_ACTIONS[self.rules.action_masks[self.skill_points]])
         
     def is_valid_action(self, move: str) -> bool:
         """Return True if a character can perform the given action. Else return 
@@ -250,134 +266,32 @@ class Rogue(Character):
         >>> True
         >>> x.is_valid_action('r')
         >>> False"""
-        
-        if self.skill_points >= 10:
-            return move in ['A', 'S']    
-        elif self.skill_points >= 3:
-            return move in ['A']            
-        return False
+        return bool(self.rules.action_masks[self.skill_points] & 
+                    ABILITY_BITS.get(move, 0))
+    
+    
+class Rogue(Character):
+    """A rogue type character class. Inherits from character"""
+    rules = RULES['r']
         
                  
 class Mage(Character):
     """A Mage type character class. Inherits from character"""
-    def __init__(self, name: str, battle_queue: 'BattleQueue', 
-                 playstyle: 'Playstyle') -> None:
-        """Inherits from character class
-        
-        >>> from a1_battle_queue import BattleQueue 
-        >>> from a1_playstyle import ManualPlaystyle
-        >>> bq = BattleQueue()
-        >>> ps = ManualPlaystyle(bq)
-        >>> P1 = Mage('Mike', bq, ps)
-        >>> x.battle_queue == bq
-        >>> True
-        >>> x.skill_points == 100
-        >>> True
-        >>> x.health == 100
-        >>> True"""
-        
-        super().__init__(name, battle_queue, playstyle)
-        self.defense = 8
-        self.style = 'Mage'
-        self.sprite = 'mage'
-        
-    def attack(self) -> None:
-        """Performs an attack. Sets animation back to the first attack 
-        animation. Reduces enemy's health and it's own characters skill points
-        and add's it's self to the end of the battle queue
-        
-        >>> from a1_battle_queue import BattleQueue 
-        >>> from a1_playstyle import ManualPlaystyle
-        >>> bq = BattleQueue()
-        >>> ps = ManualPlaystyle(bq)
-        >>> x = mage('adam', bq, ps)
-        >>> y = rogue('mike', bq, ps)
-        >>> x.get_hp()
-        >>> 100
-        >>> x.attack()
-        >>> y.get_hp()
-        >>> 90
-        >>> x.get_next_sprite()
-        >>> 'mage_attack_0'
-        >>> x.get_sp()
-        >>> 95
-        >>> bq.queue[-1]
-        >>> x
-        """        
-        self.last_animation = ('attack', -1)
-        self.enemy.health = max(0, self.enemy.health - 20 + self.enemy.defense)
-        self.skill_points = max(0, self.skill_points - 5)
-        self.battle_queue.add(self)
-        
-    def special_attack(self) -> None:
-        """Performs a special attack. Sets animation back to the first special
-        attack animation. Reduces enemy's health and it's own characters skill
-        points. Add's the enemy and then it's self to the end of the battle
-        queue.
-        
-        >>> from a1_battle_queue import BattleQueue 
-        >>> from a1_playstyle import ManualPlaystyle
-        >>> bq = BattleQueue()
-        >>> ps = ManualPlaystyle(bq)
-        >>> x = mage('adam', bq, ps)
-        >>> y = rogue('mike', bq, ps)
-        >>> y.get_hp()
-        >>> 100
-        >>> x.special_attack()
-        >>> bq.queue[-2:]
-        >>> [y, x]
-        >>> y.get_hp()
-        >>> 70
-        >>> x.get_next_sprite()
-        >>> 'mage_special_0'
-        >>> x.get_sp()
-        >>> 70
-        """        
-        self.last_animation = ('special', -1)
-        self.enemy.health = max(0, self.enemy.health - 40 + self.enemy.defense)
-        self.skill_points = max(0, self.skill_points - 30)
-        self.battle_queue.add(self.enemy)    
-        self.battle_queue.add(self)  
-      
-    def get_available_actions(self) -> list:
-        """Return all available attacks for the character to perform. Return 
-        None if the character can not perform any attacks.
-        
-        >>> from a1_battle_queue import BattleQueue 
-        >>> from a1_playstyle import ManualPlaystyle
-        >>> bq = BattleQueue()
-        >>> ps = ManualPlaystyle(bq)
-        >>> x = mage('adam', bq, ps)
-        >>> x.get_available_actions()
-        >>> ['A', 'S']
-        """        
-        if self.skill_points >= 30:
-            return ['A', 'S']
-        elif self.skill_points >= 5:
-            return ['A']       
-        return []
-        
-    def is_valid_action(self, move: str) -> bool:
-        """Return True if a character can perform the given action. Else return 
-        False.
-        
-        >>> from a1_battle_queue import BattleQueue 
-        >>> from a1_playstyle import ManualPlaystyle
-        >>> bq = BattleQueue()
-        >>> ps = ManualPlaystyle(bq)
-        >>> x = mage('adam', bq, ps)
-        >>> x.is_valid_action('A')
-        >>> True
-        >>> x.is_valid_action('S')
-        >>> True
-        >>> x.is_valid_action('r')
-        >>> False
-        """        
-        if self.skill_points >= 30:
-            return move in ['A', 'S']        
-        elif self.skill_points >= 5:
-            return move in ['A']          
-        return False
+    rules = RULES['m']
+
+
+def make_character_class(key: str) -> type:
+    """Return a Character subclass playing by CLASS_DEFINITIONS[key], so a
+    class that only has a definition can be played without writing any code.
+    
+    >>> make_character_class('r').rules == Rogue.rules
+    True
+    """
+    rules = compile_class(CLASS_DEFINITIONS[key])
+    return type(rules.name, (Character,), 
+                {'rules': rules, 
+                 '__doc__': 'A {} type character class. Inherits from '
+                            'character'.format(rules.name)})
         
         
 if __name__ == '__main__':
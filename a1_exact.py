@@ -0,0 +1,96 @@
+"""
+Exact outcome probabilities for Random vs Random matchups.
+
+Sampling (a1_monte_carlo.py) is too noisy to compare small balance changes.
+This evaluator instead carries the exact probability distribution over game
+states forward one turn at a time, using the rules in a1_rules and the
+choice RandomPlaystyle makes: 'A' or 'S' with probability 1/2 each when both
+are legal, otherwise 'A'. States reached along different lines of play are
+merged, so each distinct state is expanded once per turn.
+
+Probabilities are Fractions, so the results are exact.
+
+Run this file to evaluate every pairing:
+    python a1_exact.py
+"""
+import time
+from fractions import Fraction
+
+from a1_rules import RULES, apply_move, initial_state, legal_moves, \
+    state_winner
+
+
+def evaluate(p1_class: str, p2_class: str) -> dict:
+    """
+    Return the exact outcome of Random vs Random p1_class vs p2_class
+    (keys of a1_rules.RULES).
+
+    The result has 'p1_win', 'p2_win' and 'tie' (probabilities),
+    'expected_turns', 'length_distribution' (the probability that the game
+    lasts exactly t turns, for each t) and 'states' (how many distinct states
+    were expanded).
+
+    >>> result = evaluate('m', 'm')
+    >>> result['p1_win'] + result['p2_win'] + result['tie']
+    Fraction(1, 1)
+    """
+    matchup = (RULES[p1_class], RULES[p2_class])
+    outcomes = [Fraction(0), Fraction(0), Fraction(0)]
+    length_distribution = [Fraction(0)]
+    expanded = 0
+
+    distribution = {initial_state(): Fraction(1)}
+    turn = 0
+    while distribution:
+        turn += 1
+        length_distribution.append(Fraction(0))
+        next_distribution = {}
+        for state, probability in distribution.items():
+            expanded += 1
+            moves = legal_moves(matchup, state)
+            if not moves:
+                # The player to move can never act again; a tie
+                outcomes[2] += probability
+                length_distribution[turn - 1] += probability
+                continue
+
+            share = probability / len(moves)
+            for move in moves:
+                next_state = apply_move(matchup, state, move)
+                winner = state_winner(next_state)
+                if winner is not None:
+                    outcomes[winner] += share
+                    length_distribution[turn] += share
+                else:
+                    next_distribution[next_state] = \
+                        next_distribution.get(next_state, 0) + share
+        distribution = next_distribution
+
+    return {'p1_win': outcomes[0],
+            'p2_win': outcomes[1],
+            'tie': outcomes[2],
+            'expected_turns': sum(t * p for t, p in
+                                  enumerate(length_distribution)),
+            'length_distribution': length_distribution,
+            'states': expanded}
+
+
+def main() -> None:
+    """
+    Evaluate every pairing and print the exact win rates.
+    """
+    for p1_class in sorted(RULES):
+        for p2_class in sorted(RULES):
+            start = time.perf_counter()
+            result = evaluate(p1_class, p2_class)
+            elapsed = time.perf_counter() - start
+            print('{} vs {}: P1 {:.6f}  P2 {:.6f}  Tie {:.6f}  '
+                  'Expected turns {:.4f}  ({} states, {:.3f}s)'.format(
+                      p1_class, p2_class, float(result['p1_win']),
+                      float(result['p2_win']), float(result['tie']),
+                      float(result['expected_turns']), result['states'],
+                      elapsed))
+
+
+if __name__ == '__main__':
+    main()
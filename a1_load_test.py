@@ -0,0 +1,138 @@
+"""
+A load generator for the A1 match server (a1_server.py).
+
+Keeps a number of matches in flight against a running server, each played
+by two simulated clients that pick a random legal move whenever it's their
+turn. Reports completed matches per second and the latency from sending a
+move to receiving the state update for it.
+
+Start a server, then run this file against it:
+    python a1_server.py &
+    python a1_load_test.py --concurrency 500 --matches 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import List
+
+
+async def _connect(host: str, port: int, unix_path: str) -> tuple:
+    """
+    Open a connection to the server.
+    """
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def play_client(host: str, port: int, unix_path: str, name: str,
+                      latencies: List[float]) -> bool:
+    """
+    Join a match as name, playing random legal moves until it ends. Append
+    the latency of each move, in milliseconds, to latencies. Return whether
+    the match was played to the end.
+    """
+    reader, writer = await _connect(host, port, unix_path)
+    writer.write(json.dumps({'class': random.choice('mr'),
+                             'name': name}).encode() + b'\n')
+    await writer.drain()
+
+    sent = None
+    finished = False
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if sent is not None:
+                latencies.append((time.perf_counter() - sent) * 1000)
+                sent = None
+
+            if message['type'] != 'state':
+                if message['type'] in ('timeout', 'left'):
+                    break
+                continue
+            if message['game_over']:
+                finished = True
+                break
+
+            if message['current_player'] == name and message['actions']:
+                writer.write(random.choice(message['actions']).encode() +
+                             b'\n')
+                sent = time.perf_counter()
+                await writer.drain()
+    finally:
+        writer.close()
+    return finished
+
+
+async def run_load(host: str, port: int, unix_path: str, concurrency: int,
+                   matches: int) -> dict:
+    """
+    Play matches matches against the server, concurrency at a time, and
+    return 'matches', 'elapsed', 'matches_per_second' and the 'p50' and
+    'p99' move latencies in milliseconds.
+    """
+    latencies = []
+    started = 0
+    completed = 0
+
+    async def worker() -> None:
+        nonlocal started, completed
+        while started < matches:
+            match_id = started
+            started += 1
+            results = await asyncio.gather(
+                play_client(host, port, unix_path,
+                            'p1-{}'.format(match_id), latencies),
+                play_client(host, port, unix_path,
+                            'p2-{}'.format(match_id), latencies))
+            completed += all(results)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {'matches': completed,
+            'elapsed': elapsed,
+            'matches_per_second': completed / elapsed if elapsed else 0.0,
+            'p50': _percentile(latencies, 0.50),
+            'p99': _percentile(latencies, 0.99)}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Return the value at fraction of the way through ordered, a sorted list.
+    """
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main() -> None:
+    """
+    Run the load generator from the command line.
+    """
+    parser = argparse.ArgumentParser(description='A1 match server load test')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='connect to this Unix socket path')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='matches in flight at once')
+    parser.add_argument('--matches', type=int, default=1000)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args.host, args.port, args.unix,
+                                  args.concurrency, args.matches))
+    print('{} matches in {:.3f}s ({:.0f} matches/s)'.format(
+        report['matches'], report['elapsed'], report['matches_per_second']))
+    print('Move latency: p50 {:.2f} ms, p99 {:.2f} ms'.format(
+        report['p50'], report['p99']))
+
+
+if __name__ == '__main__':
+    main()
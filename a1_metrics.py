@@ -0,0 +1,215 @@
+"""
+Opt-in metrics for A1.
+
+The game keeps timings and counters here when ENABLED is True: per-turn
+counters and decision latency per playstyle from GameSession.perform_attack,
+and frame times and input latency from the a1_ui.py main loop. When ENABLED
+is False each hook is a single module attribute check, so they are left in
+place in normal play.
+
+Metrics live in an in-process registry: counter() and histogram() return
+the metric with a name, creating it on first use, and snapshot() returns
+them all as plain data. enable() turns collection on and dumps a snapshot
+as JSON when the process exits or receives SIGUSR1. Setting the A1_METRICS
+environment variable to a path (or '-' for stderr) enables it on import:
+    A1_METRICS=metrics.json python a1_simulate.py m r
+"""
+import atexit
+import os
+import signal
+import sys
+import time
+from bisect import bisect_left
+from typing import Dict, List, Union
+
+# Whether metrics are being collected. Hooks check this before doing
+# anything else.
+ENABLED = False
+
+# Bucket upper bounds, in milliseconds, for latency and frame time
+# histograms
+MILLISECOND_BUCKETS = [0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 16.7, 20, 33.3, 50,
+                       100, 250, 500, 1000]
+
+# Bucket upper bounds for queue lengths and turns per match
+COUNT_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class Counter:
+    """
+    A count of events.
+
+    value - the count
+    """
+    value: int
+
+    def __init__(self) -> None:
+        """
+        Initialize this Counter at 0.
+        """
+        self.value = 0
+
+    def add(self, amount: int = 1) -> None:
+        """
+        Add amount to this Counter.
+        """
+        self.value += amount
+
+    def snapshot(self) -> int:
+        """
+        Return the count.
+        """
+        return self.value
+
+
+class Histogram:
+    """
+    A distribution of observed values, counted in buckets.
+
+    buckets - the upper bound of each bucket, ascending; values above the
+              last bound are counted in one more bucket
+    counts - how many values fell in each bucket
+    count, total, minimum, maximum - of every value observed
+    """
+    buckets: List[float]
+    counts: List[int]
+    count: int
+    total: float
+    minimum: Union[float, None]
+    maximum: Union[float, None]
+
+    def __init__(self, buckets: List[float]) -> None:
+        """
+        Initialize this Histogram with no values.
+
+        >>> histogram = Histogram([1, 10])
+        >>> for value in (0.5, 3, 7, 50):
+        ...     histogram.observe(value)
+        >>> histogram.counts
+        [1, 2, 1]
+        """
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def observe(self, value: float) -> None:
+        """
+        Record value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def snapshot(self) -> dict:
+        """
+        Return the distribution as plain data.
+        """
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else None,
+                'min': self.minimum,
+                'max': self.maximum,
+                'buckets': {('<={}'.format(bound) if i < len(self.buckets)
+                             else '>{}'.format(self.buckets[-1])): count
+                            for i, (bound, count) in enumerate(
+                                zip(self.buckets + [None], self.counts))
+                            if count}}
+
+
+# Every metric, by name
+REGISTRY: Dict[str, Union[Counter, Histogram]] = {}
+
+
+def counter(name: str) -> Counter:
+    """
+    Return the Counter called name, creating it if needed.
+
+    >>> counter('example.events').add(2)
+    >>> REGISTRY['example.events'].value
+    2
+    """
+    metric = REGISTRY.get(name)
+    if metric is None:
+        metric = REGISTRY[name] = Counter()
+    return metric
+
+
+def histogram(name: str,
+              buckets: List[float] = MILLISECOND_BUCKETS) -> Histogram:
+    """
+    Return the Histogram called name, creating it with buckets if needed.
+    """
+    metric = REGISTRY.get(name)
+    if metric is None:
+        metric = REGISTRY[name] = Histogram(buckets)
+    return metric
+
+
+def snapshot() -> dict:
+    """
+    Return every metric as plain data, by name.
+    """
+    return {name: metric.snapshot()
+            for name, metric in sorted(REGISTRY.items())}
+
+
+def dump(path: str = '-') -> None:
+    """
+    Write a snapshot of every metric as JSON to path, or to stderr if path
+    is '-'.
+    """
+    # Only needed when dumping, so it isn't imported with the game
+    import json
+
+    report = {'time': time.time(), 'pid': os.getpid(), 'metrics': snapshot()}
+    if path == '-':
+        json.dump(report, sys.stderr, indent=2)
+        sys.stderr.write('\n')
+    else:
+        with open(path, 'w') as output:
+            json.dump(report, output, indent=2)
+
+
+def enable(path: str = '-') -> None:
+    """
+    Start collecting metrics, and dump them to path (see dump) when the
+    process exits or receives SIGUSR1.
+    """
+    global ENABLED
+
+    if ENABLED:
+        return
+    ENABLED = True
+    atexit.register(dump, path)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump(path))
+
+
+def record_turn(session: 'GameSession', playstyle: 'Playstyle',
+                decision_ms: float, turn_ms: float, valid: bool,
+                was_over: bool) -> None:
+    """
+    Record one call of GameSession.perform_attack: how long playstyle took
+    to decide and the whole turn took (in milliseconds), whether the move
+    was valid, and, if this turn ended the match (was_over being whether
+    it had already ended), how many turns it took.
+    """
+    counter('turns.valid' if valid else 'turns.invalid').add()
+    histogram('turn.ms').observe(turn_ms)
+    histogram('decision.ms.{}'.format(type(playstyle).__name__)).observe(
+        decision_ms)
+    histogram('queue.length', COUNT_BUCKETS).observe(
+        len(session.battle_queue))
+    if session.game_is_over and not was_over:
+        counter('matches.finished').add()
+        histogram('match.turns', COUNT_BUCKETS).observe(session.turns)
+
+
+if os.environ.get('A1_METRICS'):
+    enable(os.environ['A1_METRICS'])
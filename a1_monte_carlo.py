@@ -0,0 +1,253 @@
+"""
+A vectorized Monte Carlo simulator for RandomPlaystyle matchups.
+
+Instead of looping over Character objects, the HP, SP and battle queue of N
+games are held in NumPy arrays and every game still in progress takes its
+turn in the same step. Each step applies the compiled rules of both classes
+from a1_rules.py, whatever abilities they define and however many queue
+entries each adds, and the choice RandomPlaystyle makes: an even pick
+among the legal abilities.
+
+Run this file to estimate win rates for every pairing:
+    python a1_monte_carlo.py --games 1000000 --seed 1
+"""
+import argparse
+import time
+
+import numpy as np
+
+from a1_rules import RULES, STARTING_HP, STARTING_SP
+
+# The most games stepped at once; larger runs are split into batches of this
+# size to bound memory use
+DEFAULT_BATCH_SIZE = 1 << 18
+
+
+def _queue_capacity(p1_class: str, p2_class: str) -> int:
+    """
+    Return the longest the battle queue can get in a p1_class vs p2_class
+    game.
+
+    The queue starts with both players, and each move removes the mover and
+    adds its ability's queue entries. An ability adding more than one entry
+    can only be used as often as its cost allows, so the queue is bounded;
+    raise ValueError if a free ability could grow it without limit.
+
+    >>> _queue_capacity('m', 'r')
+    15
+    """
+    capacity = 2
+    for character_class in (p1_class, p2_class):
+        for ability in RULES[character_class].abilities.values():
+            growth = len(ability.queue) - 1
+            if growth <= 0:
+                continue
+            if ability.cost <= 0:
+                raise ValueError('a free ability of {} grows the battle '
+                                 'queue without limit'.format(
+                                     RULES[character_class].name))
+            capacity += growth * (STARTING_SP // ability.cost)
+    return capacity
+
+
+def _ability_table(p1_class: str, p2_class: str) -> dict:
+    """
+    Return the abilities of both classes as arrays indexed by [player,
+    ability], in each class's ability order, padded to the same number of
+    abilities: 'usable' (False for padding), 'damage', 'cost', 'added' (how
+    many queue entries the ability adds) and 'adds_enemy' (indexed by
+    [player, ability, entry]; 1 where the entry is the user's enemy).
+
+    It also has 'masks', indexed by [player, SP], with bit i set if ability
+    i is legal, and for every mask 'options' (how many abilities are legal)
+    and 'nth' (indexed by [mask, n], the nth legal ability), as in the
+    action masks of a1_rules.
+    """
+    abilities = [list(RULES[c].abilities.values()) for c in (p1_class,
+                                                           p2_class)]
+    width = max(map(len, abilities))
+    longest = max(len(ability.queue) for player in abilities
+                  for ability in player)
+    table = {'usable': np.zeros((2, width), dtype=bool),
+             'damage': np.zeros((2, width), dtype=np.int16),
+             'cost': np.zeros((2, width), dtype=np.int16),
+             'added': np.zeros((2, width), dtype=np.int64),
+             'adds_enemy': np.zeros((2, width, max(1, longest)),
+                                    dtype=np.int8)}
+    for player, player_abilities in enumerate(abilities):
+        for i, ability in enumerate(player_abilities):
+            table['usable'][player, i] = True
+            table['damage'][player, i] = ability.damage
+            table['cost'][player, i] = ability.cost
+            table['added'][player, i] = len(ability.queue)
+            for entry, who in enumerate(ability.queue):
+                table['adds_enemy'][player, i, entry] = who == 'enemy'
+
+    sp = np.arange(STARTING_SP + 1)
+    bits = 1 << np.arange(width)
+    legal = (table['usable'][:, None, :] &
+             (sp[None, :, None] >= table['cost'][:, None, :]))
+    table['masks'] = (legal * bits).sum(axis=2)
+    table['options'] = np.array([bin(mask).count('1')
+                                 for mask in range(1 << width)])
+    table['nth'] = np.zeros((1 << width, max(1, width)), dtype=np.int64)
+    for mask in range(1 << width):
+        legal_abilities = [i for i in range(width) if mask >> i & 1]
+        table['nth'][mask, :len(legal_abilities)] = legal_abilities
+    return table
+
+
+def _simulate_batch(p1_class: str, p2_class: str, games: int,
+                    rng: 'np.random.Generator') -> tuple:
+    """
+    Play games Random vs Random games of p1_class against p2_class and return
+    (winners, turns). A winner is 0 for P1, 1 for P2 or -1 for a tie.
+    """
+    defense = np.array([RULES[c].defense for c in (p1_class, p2_class)],
+                       dtype=np.int16)
+    abilities = _ability_table(p1_class, p2_class)
+    usable = abilities['usable']
+    masks = abilities['masks']
+    options_of = abilities['options']
+    nth = abilities['nth']
+    ability_damage = abilities['damage']
+    ability_cost = abilities['cost']
+    added = abilities['added']
+    adds_enemy = abilities['adds_enemy']
+    # The most entries every ability adds, so adding that many needs no
+    # masking, and whether the queue can ever empty
+    always_added = added[usable].min()
+
+    capacity = _queue_capacity(p1_class, p2_class)
+    hp = np.full((games, 2), STARTING_HP, dtype=np.int16)
+    sp = np.full((games, 2), STARTING_SP, dtype=np.int16)
+    queue = np.zeros((games, capacity), dtype=np.int8)
+    queue[:, 1] = 1
+    head = np.zeros(games, dtype=np.int64)
+    tail = np.full(games, 2, dtype=np.int64)
+    turns = np.zeros(games, dtype=np.int32)
+    winners = np.full(games, -1, dtype=np.int8)
+
+    active = np.arange(games)
+    while active.size:
+        # A game whose queue has emptied is over, with no winner
+        if not always_added:
+            active = active[head[active] < tail[active]]
+        current = queue[active, head[active] % capacity].astype(np.int64)
+        enemy = 1 - current
+        current_sp = sp[active, current]
+
+        # A player who can't afford any ability can never act again, so the
+        # game can't progress; count it as a tie
+        mask = masks[current, current_sp]
+        if not mask.all():
+            can_act = mask > 0
+            active = active[can_act]
+            current = current[can_act]
+            enemy = enemy[can_act]
+            current_sp = current_sp[can_act]
+            mask = mask[can_act]
+
+        # Pick one of the legal abilities evenly, as RandomPlaystyle does
+        pick = (rng.random(active.size) * options_of[mask]).astype(np.int64)
+        choice = nth[mask, pick]
+
+        damage = ability_damage[current, choice] - defense[enemy]
+        hp[active, enemy] = np.maximum(0, hp[active, enemy] - damage)
+        sp[active, current] = np.maximum(
+            0, current_sp - ability_cost[current, choice])
+
+        # Add the ability's queue entries, relative to the mover
+        entries = added[current, choice]
+        for entry in range(adds_enemy.shape[2]):
+            if entry < always_added:
+                queue[active, tail[active] % capacity] = (
+                    current ^ adds_enemy[current, choice, entry])
+                tail[active] += 1
+                continue
+            adding = entries > entry
+            games_adding = active[adding]
+            queue[games_adding, tail[games_adding] % capacity] = (
+                current[adding] ^ adds_enemy[current[adding], choice[adding],
+                                             entry])
+            tail[games_adding] += 1
+
+        # Remove the player who just acted from the front of the queue
+        head[active] += 1
+        turns[active] += 1
+
+        finished = hp[active, enemy] == 0
+        winners[active[finished]] = current[finished]
+        active = active[~finished]
+
+    return winners, turns
+
+
+def simulate(p1_class: str, p2_class: str, games: int, seed: int = None,
+             batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Play games Random vs Random games of p1_class against p2_class (keys of
+    a1_rules.RULES) and return their outcome distribution.
+
+    The result has 'p1_wins', 'p2_wins' and 'ties' (counts), 'p1_win_rate',
+    'p2_win_rate' and 'tie_rate', 'mean_turns', and 'turn_histogram', where
+    turn_histogram[t] is the number of games that lasted t turns.
+
+    >>> result = simulate('m', 'r', 1000, seed=1)
+    >>> result['p1_wins'] + result['p2_wins'] + result['ties']
+    1000
+    """
+    rng = np.random.default_rng(seed)
+    outcomes = np.zeros(3, dtype=np.int64)
+    histogram = np.zeros(0, dtype=np.int64)
+
+    remaining = games
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        winners, turns = _simulate_batch(p1_class, p2_class, size, rng)
+        outcomes += np.bincount(winners + 1, minlength=3)
+        counts = np.bincount(turns)
+        if counts.size > histogram.size:
+            counts[:histogram.size] += histogram
+            histogram = counts
+        else:
+            histogram[:counts.size] += counts
+        remaining -= size
+
+    total = max(1, games)
+    return {'p1_wins': int(outcomes[1]),
+            'p2_wins': int(outcomes[2]),
+            'ties': int(outcomes[0]),
+            'p1_win_rate': outcomes[1] / total,
+            'p2_win_rate': outcomes[2] / total,
+            'tie_rate': outcomes[0] / total,
+            'mean_turns': float(np.arange(histogram.size) @ histogram) / total,
+            'turn_histogram': histogram}
+
+
+def main() -> None:
+    """
+    Estimate Random vs Random win rates for every pairing of classes.
+    """
+    parser = argparse.ArgumentParser(
+        description='Vectorized Monte Carlo for RandomPlaystyle matchups')
+    parser.add_argument('--games', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    for p1_class in sorted(RULES):
+        for p2_class in sorted(RULES):
+            start = time.perf_counter()
+            result = simulate(p1_class, p2_class, args.games, args.seed,
+                              args.batch_size)
+            elapsed = time.perf_counter() - start
+            print('{} vs {}: P1 {:.4f}  P2 {:.4f}  Tie {:.4f}  '
+                  'Mean turns {:.2f}  ({:.0f} games/s)'.format(
+                      p1_class, p2_class, result['p1_win_rate'],
+                      result['p2_win_rate'], result['tie_rate'],
+                      result['mean_turns'], args.games / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,12 @@ either a normal or a special attack, it should return either 'A' or
 'S') at random.
 """
 from typing import Any
-from random import choice
+
+from a1_policy_table import DEFAULT_POLICY_PATH, open_policy_table
+from a1_rng import BatchedRandom
+from a1_rules import ABILITY_BITS, MASK_ACTIONS, STYLE_KEYS
+from a1_search import DEFAULT_TIME_BUDGET, ExpectimaxSearch
+from a1_solver import Solver, state_from_characters
 
 
 class Playstyle:
@@ -26,18 +31,27 @@ class Playstyle:
     The Playstyle superclass.
     
     is_manual - Whether the class is a manual Playstyle or not.
+    is_time_limited - Whether the class's moves depend on how much it gets
+                      done in a fixed time, so a seed alone doesn't decide
+                      them.
     battle_queue - The BattleQueue corresponding to the game this Playstyle is
                    being used in.
+    rng - The random source for any random decisions. A GameSession gives
+          both of its playstyles its own seeded source.
     """
-    is_manual: bool
+    is_manual: bool = True
+    is_time_limited: bool = False
     battle_queue: 'BattleQueue'
+    rng: BatchedRandom = None
     
-    def __init__(self, battle_queue: 'BattleQueue') -> None:
+    def __init__(self, battle_queue: 'BattleQueue', 
+                 rng: BatchedRandom = None) -> None:
         """
         Initialize this Playstyle with BattleQueue as its battle queue.
         """
         self.battle_queue = battle_queue
         self.is_manual = True
+        self.rng = rng
     
     def select_attack(self, parameter: Any = None) -> str:
         """
@@ -63,25 +77,33 @@ class ManualPlaystyle(Playstyle):
         Return 'X' if a valid move cannot be found.
         """
       
-        if parameter in ['A', 'S']:
+        if parameter in ABILITY_BITS:
             return parameter
 
         return 'X'
 
+# Used by playstyles that weren't given a random source
+_UNSEEDED = BatchedRandom()
+
 # Implement a random playstyle that selects an attack at random.
-# Importing random and using random.choice might be helpful.
+# Choices come from the playstyle's rng (see a1_rng), not the global random
+# module, so seeded matches can be reproduced.
 
 class RandomPlaystyle(Playstyle):
     """
     The RandomPlaystyle. Inherits from Playstyle.
     """
+    is_manual = False
    
-    def __init__(self, battle_queue: 'BattleQueue') -> None:
+    def __init__(self, battle_queue: 'BattleQueue', 
+                 rng: BatchedRandom = None) -> None:
         """
-        Initialize this Playstyle with BattleQueue as its battle queue.
+        Initialize this Playstyle with BattleQueue as its battle queue,
+        drawing its choices from rng (a shared unseeded source if None).
         """
         self.battle_queue = battle_queue
         self.is_manual = False
+        self.rng = rng
     
         
     def select_attack(self, parameter: Any = None) -> str:
@@ -95,17 +117,138 @@ class RandomPlaystyle(Playstyle):
         """
         player = self.battle_queue.first_player_with_action()
         
-        if player.style == 'Rogue':
-            if player.skill_points >= 10:
-                return choice(['A', 'S']) 
-            return 'A'
-        
-        elif player.style == 'Mage':
-            if player.skill_points >= 30:
-                return choice(['A', 'S']) 
-            return 'A'        
+        # One lookup gives every legal move (see a1_rules.MASK_ACTIONS)
+        actions = MASK_ACTIONS[player.rules.action_masks[player.skill_points]]
+        if len(actions) > 1:
+            return (self.rng or _UNSEEDED).choice(actions)
+        elif actions:
+            return actions[0]
         return 'X'
 
+    
+class SearchPlaystyle(Playstyle):
+    """
+    The SearchPlaystyle. Inherits from Playstyle.
+    
+    Chooses attacks with a time-limited expectimax search (see a1_search),
+    treating a RandomPlaystyle opponent's turns as coin flips and any other
+    opponent's as their best reply.
+    
+    search - the ExpectimaxSearch used, which keeps its cache and statistics
+             across turns
+    """
+    is_manual = False
+    is_time_limited = True
+    search: ExpectimaxSearch
+    
+    def __init__(self, battle_queue: 'BattleQueue', 
+                 time_budget: float = DEFAULT_TIME_BUDGET) -> None:
+        """
+        Initialize this Playstyle with BattleQueue as its battle queue,
+        searching for at most time_budget seconds per attack.
+        """
+        self.battle_queue = battle_queue
+        self.is_manual = False
+        self.search = ExpectimaxSearch(time_budget)
+        
+    @property
+    def nodes_per_second(self) -> float:
+        """
+        Return how many nodes this Playstyle has searched per second.
+        """
+        return self.search.nodes_per_second
+        
+    def select_attack(self, parameter: Any = None) -> str:
+        """
+        Return the best attack found for the next character in this
+        Playstyle's battle_queue to perform.
+        
+        parameter will always be None.
+        
+        Return 'X' if a valid move cannot be found.
+        """
+        player = self.battle_queue.first_player_with_action()
+        enemy = player.enemy
+        return self.search.choose((player.rules, enemy.rules),
+                                  state_from_characters(player, enemy),
+                                  isinstance(enemy.playstyle, RandomPlaystyle))
+
+
+# The Solvers TablePlaystyles fall back on, by (player class, enemy class)
+_SOLVERS = {}
+
+    
+class TablePlaystyle(Playstyle):
+    """
+    The TablePlaystyle. Inherits from Playstyle.
+    
+    Plays the optimal attack by looking it up in the precomputed policy file
+    (see a1_policy_table), which is memory-mapped the first time an attack
+    is selected. Build the file with: python a1_policy_table.py
+    
+    If the file hasn't been built, was built for other class rules, or
+    doesn't cover a pairing, the optimal attack is worked out with an
+    a1_solver.Solver instead, one per class pairing, shared by every
+    TablePlaystyle in the process.
+    
+    path - the policy file to use
+    """
+    is_manual = False
+    path: str
+    
+    def __init__(self, battle_queue: 'BattleQueue', 
+                 path: str = DEFAULT_POLICY_PATH) -> None:
+        """
+        Initialize this Playstyle with BattleQueue as its battle queue.
+        """
+        self.battle_queue = battle_queue
+        self.is_manual = False
+        self.path = path
+        self._table = None
+        self._use_table = True
+        
+    def select_attack(self, parameter: Any = None) -> str:
+        """
+        Return the optimal attack for the next character in this Playstyle's
+        battle_queue to perform.
+        
+        parameter will always be None.
+        
+        Return 'X' if a valid move cannot be found.
+        """
+        player = self.battle_queue.first_player_with_action()
+        enemy = player.enemy
+        player_class = STYLE_KEYS[player.style]
+        enemy_class = STYLE_KEYS[enemy.style]
+        
+        table = self._policy_table()
+        if table is None or not table.covers(player_class, enemy_class):
+            solver = _SOLVERS.get((player_class, enemy_class))
+            if solver is None:
+                solver = _SOLVERS[(player_class, enemy_class)] = \
+                    Solver(player_class, enemy_class)
+            return solver.best_move(
+                state_from_characters(player, enemy)) or 'X'
+        
+        head_bits = table.head_bits(player_class, enemy_class)
+        following = [0 if character is player else 1 
+                     for character in self.battle_queue.head(head_bits + 1)]
+        return table.lookup(player_class, enemy_class, 
+                            player.get_hp(), enemy.get_hp(),
+                            player.get_sp(), enemy.get_sp(), following[1:])
+    
+    def _policy_table(self) -> 'PolicyTable':
+        """
+        Return the policy table at this Playstyle's path, mapping it on first
+        use, or None if it is missing or out of date.
+        """
+        if self._table is None and self._use_table:
+            try:
+                self._table = open_policy_table(self.path)
+            except (OSError, ValueError):
+                self._use_table = False
+        return self._table
+
 
 if __name__ == '__main__':
     import python_ta
@@ -0,0 +1,287 @@
+"""
+A precomputed policy table for A1.
+
+The game is small enough that the best move from every reachable state can
+be worked out ahead of time (see a1_solver.py) and stored, so a playstyle
+never has to search during a match. Running this file builds a compact
+binary policy file covering every class pairing:
+    python a1_policy_table.py
+
+PolicyTable memory-maps that file, so opening it costs next to nothing and
+every process using the same file shares one page-cached copy. Each lookup
+is a handful of array reads.
+
+Layout: states are seen from the player to move (player 0) against their
+enemy (player 1). A player's SP and their enemy's HP together pin down how
+many attacks and specials they have made, so each reachable (SP, enemy HP)
+pair is given a dense rank. A state's index is then
+
+    (rank of player 0 * ranks of player 1 + rank of player 1)
+        * 2 ** head_bits + the next head_bits turns of the queue
+
+where the queue turns after the mover are bits (1 for the enemy). head_bits
+is the fewest turns that determine the best move in every reachable state of
+the pairing; the builder checks this. Moves are stored in 2 bits each.
+
+File format (little-endian):
+    header       magic b'A1PT', version (u16), number of sections (u16),
+                 rules digest (8 bytes, see rules_digest)
+    directory    per section: player 0 class, player 1 class (1 byte each),
+                 head_bits (u8), a pad byte, player 0 ranks, player 1 ranks
+                 (u32 each), offset of the rank tables, offset of the moves
+                 (u64 each)
+    rank tables  two arrays of RANK_TABLE_SIZE int16 ranks, indexed by
+                 SP * VALUES + enemy HP (-1 where unreachable)
+    moves        4 moves per byte, lowest bits first: 0 none, 1 'A', 2 'S'
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import time
+from array import array
+from typing import Dict, List
+
+from a1_rules import RULES, STARTING_HP, STARTING_SP, legal_moves, \
+    reachable_states, state_winner
+from a1_solver import Solver
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'a1_policy.bin')
+
+MAGIC = b'A1PT'
+VERSION = 2
+HEADER = struct.Struct('<4sHH8s')
+SECTION = struct.Struct('<ccBxIIQQ')
+
+# HP and SP both range over 0..VALUES - 1
+VALUES = max(STARTING_HP, STARTING_SP) + 1
+RANK_TABLE_SIZE = VALUES * VALUES
+
+MOVE_CODES = {'A': 1, 'S': 2}
+MOVES = ['X', 'A', 'S', 'X']
+
+# Sections are aligned to this many bytes in the file
+ALIGNMENT = 8
+
+
+def _decisions(p0_class: str, p1_class: str) -> Dict[tuple, str]:
+    """
+    Return the best move of player 0 in every reachable state of the p0_class
+    vs p1_class pairing where player 0 is to move, whichever player opened.
+    """
+    solver = Solver(p0_class, p1_class)
+    matchup = (RULES[p0_class], RULES[p1_class])
+    decisions = {}
+    for opening in ((0, 1), (1, 0)):
+        start = (STARTING_HP, STARTING_HP, STARTING_SP, STARTING_SP, opening)
+        for state in reachable_states(matchup, start):
+            if (state[4][0] == 0 and state_winner(state) is None and
+                    legal_moves(matchup, state)):
+                decisions[state] = solver.best_move(state)
+    return decisions
+
+
+def _head_key(queue: tuple, head_bits: int) -> int:
+    """
+    Return the next head_bits turns after the front of queue as an int.
+    """
+    key = 0
+    following = queue[1:head_bits + 1]
+    for player in following:
+        key = (key << 1) | player
+    return key << (head_bits - len(following))
+
+
+def build_section(p0_class: str, p1_class: str) -> tuple:
+    """
+    Return (head_bits, player 0 ranks, player 1 ranks, packed moves) for the
+    p0_class vs p1_class pairing.
+    """
+    decisions = _decisions(p0_class, p1_class)
+
+    # Rank every (SP, enemy HP) pair that each player can be in
+    ranks = [array('h', [-1]) * RANK_TABLE_SIZE for _ in range(2)]
+    counts = [0, 0]
+    for state in decisions:
+        for player in (0, 1):
+            slot = state[2 + player] * VALUES + state[1 - player]
+            if ranks[player][slot] == -1:
+                ranks[player][slot] = counts[player]
+                counts[player] += 1
+
+    # Use the fewest queue turns that determine the best move everywhere
+    head_bits = 0
+    while True:
+        entries = {}
+        consistent = True
+        for state, move in decisions.items():
+            index = ((ranks[0][state[2] * VALUES + state[1]] * counts[1] +
+                      ranks[1][state[3] * VALUES + state[0]]) << head_bits |
+                     _head_key(state[4], head_bits))
+            if entries.setdefault(index, move) != move:
+                consistent = False
+                break
+        if consistent:
+            break
+        head_bits += 1
+
+    moves = bytearray((counts[0] * counts[1] << head_bits) // 4 + 1)
+    for index, move in entries.items():
+        moves[index >> 2] |= MOVE_CODES[move] << ((index & 3) * 2)
+    return head_bits, ranks[0], ranks[1], bytes(moves)
+
+
+def rules_digest() -> bytes:
+    """
+    Return a digest of every class's compiled rules, which changes whenever
+    a class is added or rebalanced.
+
+    >>> len(rules_digest())
+    8
+    """
+    return hashlib.sha256(repr(sorted(RULES.items())).encode()).digest()[:8]
+
+
+def _align(offset: int) -> int:
+    """
+    Return offset rounded up to the next multiple of ALIGNMENT.
+    """
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def build(path: str = DEFAULT_POLICY_PATH) -> None:
+    """
+    Build the policy file for every class pairing and write it to path.
+    """
+    pairings = [(p0, p1) for p0 in sorted(RULES) for p1 in sorted(RULES)]
+    sections = [build_section(p0, p1) for p0, p1 in pairings]
+
+    directory = []
+    blobs = []
+    offset = _align(HEADER.size + SECTION.size * len(sections))
+    for (p0, p1), (head_bits, ranks0, ranks1, moves) in zip(pairings,
+                                                            sections):
+        rank_bytes = ranks0.tobytes() + ranks1.tobytes()
+        moves_offset = _align(offset + len(rank_bytes))
+        directory.append(SECTION.pack(p0.encode(), p1.encode(), head_bits,
+                                      max(ranks0) + 1, max(ranks1) + 1,
+                                      offset, moves_offset))
+        blobs.append((offset, rank_bytes))
+        blobs.append((moves_offset, moves))
+        offset = _align(moves_offset + len(moves))
+
+    with open(path, 'wb') as policy_file:
+        policy_file.write(HEADER.pack(MAGIC, VERSION, len(sections),
+                                      rules_digest()))
+        policy_file.write(b''.join(directory))
+        for blob_offset, blob in blobs:
+            policy_file.write(b'\0' * (blob_offset - policy_file.tell()))
+            policy_file.write(blob)
+
+
+class PolicyTable:
+    """
+    A memory-mapped policy file.
+
+    path - the file that was mapped
+    """
+    path: str
+
+    def __init__(self, path: str = DEFAULT_POLICY_PATH) -> None:
+        """
+        Map the policy file at path. Raise ValueError if it isn't a policy
+        file built for the current class rules.
+        """
+        self.path = path
+        with open(path, 'rb') as policy_file:
+            self._map = mmap.mmap(policy_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+
+        magic, version, count, digest = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a version {} policy file'.format(
+                path, VERSION))
+        if digest != rules_digest():
+            raise ValueError('{} was built for other class rules; rebuild '
+                             'it'.format(path))
+
+        self._sections = {}
+        for i in range(count):
+            p0, p1, head_bits, count0, count1, ranks_offset, moves_offset = \
+                SECTION.unpack_from(self._map, HEADER.size + i * SECTION.size)
+            ranks = view[ranks_offset:ranks_offset + 4 * RANK_TABLE_SIZE] \
+                .cast('h')
+            self._sections[(p0.decode(), p1.decode())] = (
+                head_bits, count1, ranks[:RANK_TABLE_SIZE],
+                ranks[RANK_TABLE_SIZE:], view[moves_offset:])
+
+    def covers(self, p0_class: str, p1_class: str) -> bool:
+        """
+        Return whether this table has the p0_class vs p1_class pairing.
+        """
+        return (p0_class, p1_class) in self._sections
+
+    def head_bits(self, p0_class: str, p1_class: str) -> int:
+        """
+        Return how many queue turns after the mover a lookup in the p0_class
+        vs p1_class pairing needs.
+        """
+        return self._sections[(p0_class, p1_class)][0]
+
+    def lookup(self, p0_class: str, p1_class: str, hp: int, enemy_hp: int,
+               sp: int, enemy_sp: int, following: List[int]) -> str:
+        """
+        Return the best move for a p0_class player to move against a
+        p1_class enemy, or 'X' if the state isn't in the table. following
+        is the next head_bits() turns of the queue after the mover, 1 for
+        each enemy turn.
+        """
+        head_bits, count1, ranks0, ranks1, moves = \
+            self._sections[(p0_class, p1_class)]
+        rank0 = ranks0[sp * VALUES + enemy_hp]
+        rank1 = ranks1[enemy_sp * VALUES + hp]
+        if rank0 < 0 or rank1 < 0:
+            return 'X'
+
+        head = 0
+        for player in following:
+            head = (head << 1) | player
+        index = ((rank0 * count1 + rank1) << head_bits |
+                 head << (head_bits - len(following)))
+        return MOVES[(moves[index >> 2] >> ((index & 3) * 2)) & 3]
+
+
+# One mapping of each policy file per process
+_TABLES = {}
+
+
+def open_policy_table(path: str = DEFAULT_POLICY_PATH) -> PolicyTable:
+    """
+    Return the PolicyTable for path, mapping it on first use.
+    """
+    table = _TABLES.get(path)
+    if table is None:
+        table = _TABLES[path] = PolicyTable(path)
+    return table
+
+
+def main() -> None:
+    """
+    Build the policy file from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Build the A1 policy file')
+    parser.add_argument('--output', default=DEFAULT_POLICY_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build(args.output)
+    print('Wrote {} ({} bytes) in {:.3f}s'.format(
+        args.output, os.path.getsize(args.output),
+        time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
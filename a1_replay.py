@@ -0,0 +1,282 @@
+"""
+Compact binary replay logs for A1.
+
+A ReplayRecorder attached to a GameSession (session.recorder) logs each
+match as its setup followed by one byte per move applied in
+perform_attack(). Recording only appends to an in-memory bytearray, so it
+adds nothing measurable to the live loop; the log reaches disk when
+write() is called, e.g. once the match is over.
+
+A log is HEADER followed by one record per match:
+    setup        P1 class, P2 class, P1 playstyle, P2 playstyle (1 byte
+                 each), flags (u8, bit 0 set if a seed is given), seed (i64)
+    moves        one byte per move, b'A' or b'S'
+    end          a 0 byte
+
+read_matches() walks a log without copying it, and replay() rebuilds only
+the BattleQueue and Characters of a match by applying its moves directly,
+without a GameSession, playstyles or rendering, so statistics can be
+re-derived from an archive faster than re-simulating. Character names are
+not recorded.
+
+Run this file to record a batch of matches and time replaying them:
+    python a1_replay.py m r --matches 100000
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, NamedTuple, Union
+
+from a1_battle_queue import BattleQueue
+from a1_game import CHARACTER_CLASSES, PLAYSTYLE_CLASSES, create_session
+from a1_rules import STYLE_KEYS
+from a1_session import GameSession
+
+MAGIC = b'A1RL'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+SETUP = struct.Struct('<ccccBq')
+
+# Flag bits, and the byte ending a match's moves
+SEEDED = 1
+END = 0
+
+# Maps each playstyle class to its key in PLAYSTYLE_CLASSES
+PLAYSTYLE_KEYS = {playstyle: key for key, playstyle in
+                  PLAYSTYLE_CLASSES.items()}
+
+
+class MatchRecord(NamedTuple):
+    """
+    One match read from a replay log.
+
+    p1_class, p2_class - keys of a1_game.CHARACTER_CLASSES
+    p1_playstyle, p2_playstyle - keys of a1_game.PLAYSTYLE_CLASSES
+    seed - the match's seed, or None
+    moves - the moves made, one byte (b'A' or b'S') each
+    """
+    p1_class: str
+    p2_class: str
+    p1_playstyle: str
+    p2_playstyle: str
+    seed: Union[int, None]
+    moves: bytes
+
+
+class ReplayedMatch(NamedTuple):
+    """
+    The state a replayed match ended in.
+
+    p1, p2 - the characters, with no playstyles
+    battle_queue - their BattleQueue
+    turns - how many moves were made
+    winner - the character that won, or None
+    """
+    p1: 'Character'
+    p2: 'Character'
+    battle_queue: BattleQueue
+    turns: int
+    winner: Union['Character', None]
+
+
+class ReplayRecorder:
+    """
+    Records matches into an in-memory replay log.
+
+    buffer - the records not yet written
+    """
+    buffer: bytearray
+
+    def __init__(self) -> None:
+        """
+        Initialize this ReplayRecorder with nothing recorded.
+        """
+        self.buffer = bytearray()
+        self._recording = False
+        self._session = None
+
+    def begin(self, session: GameSession, seed: int = None) -> None:
+        """
+        Start recording the match in session, which must not have had any
+        moves made yet, and attach this recorder to it.
+
+        >>> recorder = ReplayRecorder()
+        >>> session = create_session('m', 'r', 'r', 'r')
+        >>> recorder.begin(session, seed=7)
+        >>> session.perform_attack()
+        True
+        >>> recorder.end()
+        >>> len(recorder.buffer)
+        15
+        """
+        self.end()
+        self.buffer += SETUP.pack(
+            STYLE_KEYS[session.p1.style].encode(),
+            STYLE_KEYS[session.p2.style].encode(),
+            PLAYSTYLE_KEYS[type(session.p1.playstyle)].encode(),
+            PLAYSTYLE_KEYS[type(session.p2.playstyle)].encode(),
+            SEEDED if seed is not None else 0,
+            seed if seed is not None else 0)
+        session.recorder = self
+        self._session = session
+        self._recording = True
+
+    def record(self, move: str) -> None:
+        """
+        Record that move ('A' or 'S') was made in the current match. Raise
+        ValueError if no match is being recorded.
+        """
+        if not self._recording:
+            raise ValueError('no match is being recorded; call begin() '
+                             'first')
+        self.buffer.append(ord(move))
+
+    def end(self) -> None:
+        """
+        Finish recording the current match, if there is one, and detach
+        this recorder from its session.
+        """
+        if self._recording:
+            self.buffer.append(END)
+            self._recording = False
+            if self._session.recorder is self:
+                self._session.recorder = None
+            self._session = None
+
+    def write(self, path: str) -> None:
+        """
+        Append the finished records to the log at path, creating it if
+        needed, and forget them.
+        """
+        self.end()
+        with open(path, 'ab') as log:
+            if log.tell() == 0:
+                log.write(HEADER.pack(MAGIC, VERSION))
+            log.write(self.buffer)
+        self.buffer = bytearray()
+
+
+def read_matches(data: bytes) -> Iterator[MatchRecord]:
+    """
+    Yield every match in the replay log data (bytes, or a memory map of a
+    log file), in order. Raise ValueError if data isn't a replay log or
+    ends part way through a match.
+
+    >>> list(read_matches(HEADER.pack(MAGIC, VERSION) + b'mrrr'))
+    Traceback (most recent call last):
+    ...
+    ValueError: truncated replay log: incomplete match setup at byte 6
+    """
+    try:
+        magic, version = HEADER.unpack_from(data)
+    except struct.error:
+        magic, version = None, None
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('not a version {} replay log'.format(VERSION))
+
+    with memoryview(data) as view:
+        position = HEADER.size
+        while position < len(data):
+            if position + SETUP.size > len(data):
+                raise ValueError('truncated replay log: incomplete match '
+                                 'setup at byte {}'.format(position))
+            p1_class, p2_class, p1_playstyle, p2_playstyle, flags, seed = \
+                SETUP.unpack_from(data, position)
+            position += SETUP.size
+            end = data.find(b'\0', position)
+            if end == -1:
+                raise ValueError('truncated replay log: unterminated match '
+                                 'at byte {}'.format(position - SETUP.size))
+            yield MatchRecord(p1_class.decode(), p2_class.decode(),
+                              p1_playstyle.decode(), p2_playstyle.decode(),
+                              seed if flags & SEEDED else None,
+                              bytes(view[position:end]))
+            position = end + 1
+
+
+def read_log(path: str) -> Iterator[MatchRecord]:
+    """
+    Yield every match in the replay log file at path, which is
+    memory-mapped rather than read into memory.
+    """
+    with open(path, 'rb') as log, \
+            mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield from read_matches(data)
+
+
+def replay(record: MatchRecord) -> ReplayedMatch:
+    """
+    Return the state the recorded match ended in.
+
+    >>> recorder = ReplayRecorder()
+    >>> session = create_session('r', 'm', 'r', 'r')
+    >>> recorder.begin(session)
+    >>> while not session.game_is_over:
+    ...     _ = session.perform_attack()
+    >>> recorder.end()
+    >>> log = HEADER.pack(MAGIC, VERSION) + recorder.buffer
+    >>> copy = replay(next(read_matches(log)))
+    >>> copy.p2.get_hp() == session.p2.get_hp()
+    True
+    """
+    battle_queue = BattleQueue()
+    p1 = CHARACTER_CLASSES[record.p1_class]('P1', battle_queue, None)
+    p2 = CHARACTER_CLASSES[record.p2_class]('P2', battle_queue, None)
+    p1.enemy = p2
+    p2.enemy = p1
+    battle_queue.add(p1)
+    battle_queue.add(p2)
+    for move in record.moves:
+        battle_queue.peek().perform(chr(move))
+        battle_queue.remove()
+    return ReplayedMatch(p1, p2, battle_queue, len(record.moves),
+                         battle_queue.get_winner())
+
+
+def main() -> None:
+    """
+    Record a batch of simulated matches, then replay them and report the
+    log size and replay speed.
+    """
+    from a1_game import CHARACTER_CLASSES
+    from a1_simulate import MatchSpec, run_matches
+
+    parser = argparse.ArgumentParser(description='Record and replay A1 '
+                                                 'matches')
+    parser.add_argument('p1_class', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('p2_class', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('--matches', type=int, default=100000)
+    parser.add_argument('--log', default='a1_replays.bin',
+                        help='the replay log to write (replaced)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.log):
+        os.remove(args.log)
+    recorder = ReplayRecorder()
+    specs = [MatchSpec(args.p1_class, args.p2_class, seed=i)
+             for i in range(args.matches)]
+    report = run_matches(specs, recorder)
+    recorder.write(args.log)
+    size = os.path.getsize(args.log)
+    print('Recorded {} matches in {:.3f}s: {} bytes ({:.1f} per match)'
+          .format(args.matches, report['elapsed'], size,
+                  size / max(1, args.matches)))
+
+    start = time.perf_counter()
+    replayed = [replay(record) for record in read_log(args.log)]
+    elapsed = time.perf_counter() - start
+    print('Replayed {} matches in {:.3f}s ({:.0f} matches/s)'.format(
+        len(replayed), elapsed, len(replayed) / elapsed if elapsed else 0.0))
+
+    mismatches = sum(
+        (match.p1.get_hp(), match.p2.get_hp(), match.p1.get_sp(),
+         match.p2.get_sp()) !=
+        (result['p1_hp'], result['p2_hp'], result['p1_sp'], result['p2_sp'])
+        for match, result in zip(replayed, report['results']))
+    print('Final states differing from the simulation: {}'.format(mismatches))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+A seeded, batched random source for A1 playstyles.
+
+Calling random.choice once per decision makes matches impossible to
+reproduce unless the global generator is reseeded, and costs a call into
+the generator for every move. BatchedRandom is a per-session generator
+instead: it draws random bits a block at a time (one getrandbits() call, or
+one NumPy Generator call if asked) and hands them out as decisions are made,
+so the generator is only called once per block.
+
+Two BatchedRandoms made with the same seed, block size and backend produce
+the same decisions. The stdlib and NumPy backends produce different
+streams from the same seed.
+
+Run this file to compare it with random.choice:
+    python a1_rng.py --decisions 1000000
+"""
+import argparse
+import random
+import time
+from itertools import chain
+from typing import Iterator, List, Sequence
+
+# How many decisions are drawn at a time. Blocks start at FIRST_BLOCK_SIZE
+# and double up to BLOCK_SIZE, so a short match doesn't pay for thousands of
+# decisions it never uses.
+FIRST_BLOCK_SIZE = 64
+BLOCK_SIZE = 4096
+
+# The bits of every byte, lowest first
+_BYTE_BITS = [tuple(byte >> i & 1 for i in range(8)) for byte in range(256)]
+
+
+class BatchedRandom:
+    """
+    A random source that pre-draws blocks of coin flips.
+
+    seed - the seed given, or None if seeded from the OS
+    block_size - the most bits drawn at a time (a multiple of 8)
+    blocks_drawn - how many times the generator has been called for bits
+    bits - an endless iterator of random bits (0 or 1); next(bits) is the
+           cheapest way to take one
+    """
+    seed: int
+    block_size: int
+    blocks_drawn: int
+    bits: Iterator[int]
+
+    def __init__(self, seed: int = None, block_size: int = BLOCK_SIZE,
+                 use_numpy: bool = False) -> None:
+        """
+        Initialize this BatchedRandom with seed. If use_numpy is True, bits
+        are drawn with a NumPy Generator instead of the random module.
+
+        >>> [next(BatchedRandom(5).bits) for _ in range(3)] == \\
+        ...     [next(BatchedRandom(5).bits) for _ in range(3)]
+        True
+        """
+        if block_size % 8:
+            raise ValueError('block_size must be a multiple of 8')
+        self.seed = seed
+        self.block_size = block_size
+        self.blocks_drawn = 0
+        self._next_size = min(FIRST_BLOCK_SIZE, block_size)
+        self._random = random.Random(seed)
+        self._generator = None
+        if use_numpy:
+            import numpy
+            self._generator = numpy.random.default_rng(seed)
+        self.bits = chain.from_iterable(iter(self._draw_block, None))
+
+    def _draw_block(self) -> List[int]:
+        """
+        Return the next block of random bits.
+        """
+        self.blocks_drawn += 1
+        size = self._next_size
+        self._next_size = min(2 * size, self.block_size)
+        if self._generator is not None:
+            return self._generator.integers(0, 2, size,
+                                            dtype='uint8').tolist()
+        data = self._random.getrandbits(size).to_bytes(size // 8, 'little')
+        return list(chain.from_iterable(map(_BYTE_BITS.__getitem__, data)))
+
+    def choice(self, options: Sequence) -> object:
+        """
+        Return a random item of the non-empty sequence options. Choosing
+        between two options takes one pre-drawn bit.
+
+        >>> rng = BatchedRandom(1)
+        >>> rng.choice(['A']), rng.choice(['A', 'S']) in ('A', 'S')
+        ('A', True)
+        """
+        if len(options) == 2:
+            return options[next(self.bits)]
+        if len(options) == 1:
+            return options[0]
+        return options[self._random.randrange(len(options))]
+
+
+def main() -> None:
+    """
+    Time random.choice against BatchedRandom for two-way decisions.
+    """
+    parser = argparse.ArgumentParser(
+        description='Compare random.choice with BatchedRandom')
+    parser.add_argument('--decisions', type=int, default=1000000)
+    args = parser.parse_args()
+    options = ('A', 'S')
+
+    start = time.perf_counter()
+    for _ in range(args.decisions):
+        random.choice(options)
+    elapsed = time.perf_counter() - start
+    print('random.choice: {:.0f} ns per decision, 1 generator call per '
+          'decision'.format(elapsed / args.decisions * 1e9))
+
+    for use_numpy in (False, True):
+        rng = BatchedRandom(0, use_numpy=use_numpy)
+        start = time.perf_counter()
+        for _ in range(args.decisions):
+            rng.choice(options)
+        elapsed = time.perf_counter() - start
+        print('BatchedRandom ({}): {:.0f} ns per decision, {:.5f} generator '
+              'calls per decision'.format(
+                  'numpy' if use_numpy else 'random',
+                  elapsed / args.decisions * 1e9,
+                  rng.blocks_drawn / args.decisions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+The rules of the A1 character classes as data.
+
+Every character class is defined by an entry in CLASS_DEFINITIONS: its
+defense and, for each ability (keyed by the move that uses it, e.g. 'A' for
+attack and 'S' for special attack), the damage it deals, the SP it costs,
+who it adds to the battle queue and which animation it plays. compile_class() turns a definition into ClassRules with
+everything precomputed: a table from SP to a bitmask of the legal abilities,
+and a dispatch table of ability effects. Checking whether a move is legal or
+listing the legal moves is then a couple of array lookups.
+
+Character (a1_characters.py) plays by these rules, and so do tools which
+don't use Character objects, such as the batched simulator in
+a1_monte_carlo.py. A new class can be added by adding a definition; see
+a1_characters.make_character_class().
+
+It also describes a whole game as a small immutable state tuple with
+functions to move between states, for tools that search over games (see
+a1_solver.py).
+"""
+from typing import Dict, NamedTuple, Tuple
+
+# Every character starts with this much HP and SP
+STARTING_HP = 100
+STARTING_SP = 100
+
+# The ability keys of every class compiled so far, in action mask bit order:
+# bit i of a mask is set if ABILITY_KEYS[i] can be used. compile_class() adds
+# the keys of each definition, so these grow in place.
+ABILITY_KEYS = []
+ABILITY_BITS = {}
+
+# The legal moves for every action mask, e.g. MASK_ACTIONS[0b11] is
+# ('A', 'S')
+MASK_ACTIONS = [()]
+
+
+def add_ability_key(key: str) -> None:
+    """
+    Give the ability key its own action mask bit, if it doesn't have one.
+
+    >>> add_ability_key('A')
+    >>> ABILITY_BITS['A'], MASK_ACTIONS[0b11]
+    (1, ('A', 'S'))
+    """
+    if key in ABILITY_BITS:
+        return
+    ABILITY_BITS[key] = 1 << len(ABILITY_KEYS)
+    ABILITY_KEYS.append(key)
+    # The masks with the new (highest) bit set follow those without it
+    MASK_ACTIONS.extend([actions + (key,) for actions in MASK_ACTIONS])
+
+# Keyed the same way as a1_game.CHARACTER_CLASSES. 'queue' lists who an
+# ability adds to the end of the battle queue, in order ('self' or 'enemy').
+CLASS_DEFINITIONS = {
+    'm': {'name': 'Mage',
+          'sprite': 'mage',
+          'defense': 8,
+          'abilities': {'A': {'damage': 20, 'cost': 5,
+                              'queue': ('self',), 'animation': 'attack'},
+                        'S': {'damage': 40, 'cost': 30,
+                              'queue': ('enemy', 'self'),
+                              'animation': 'special'}}},
+    'r': {'name': 'Rogue',
+          'sprite': 'rogue',
+          'defense': 10,
+          'abilities': {'A': {'damage': 15, 'cost': 3,
+                              'queue': ('self',), 'animation': 'attack'},
+                        'S': {'damage': 20, 'cost': 10,
+                              'queue': ('self', 'self'),
+                              'animation': 'special'}}}
+}
+
+
+class Ability(NamedTuple):
+    """
+    The effect of one ability.
+
+    damage - the damage dealt, before the target's defense
+    cost - the SP spent
+    queue - who is added to the end of the battle queue, in order ('self' or
+            'enemy')
+    animation - the animation the user plays
+    """
+    damage: int
+    cost: int
+    queue: Tuple[str, ...]
+    animation: str
+
+
+class ClassRules(NamedTuple):
+    """
+    The compiled rules for one character class.
+
+    name - the class's name, e.g. 'Mage' (Character.style)
+    sprite - the name its sprites start with, e.g. 'mage'
+    defense - subtracted from the damage of every attack taken
+    abilities - maps each ability key to its Ability
+    action_masks - action_masks[sp] is the mask of abilities (see
+                   ABILITY_BITS) a character with sp SP can use
+    """
+    name: str
+    sprite: str
+    defense: int
+    abilities: Dict[str, Ability]
+    action_masks: Tuple[int, ...]
+
+
+def compile_class(definition: dict) -> ClassRules:
+    """
+    Return the ClassRules for a CLASS_DEFINITIONS entry, whatever
+    abilities it defines.
+
+    >>> rogue = compile_class(CLASS_DEFINITIONS['r'])
+    >>> MASK_ACTIONS[rogue.action_masks[9]]
+    ('A',)
+    >>> rogue.abilities['S'].queue
+    ('self', 'self')
+    """
+    abilities = {key: Ability(ability['damage'], ability['cost'],
+                              tuple(ability['queue']), ability['animation'])
+                 for key, ability in definition['abilities'].items()}
+    for key in abilities:
+        add_ability_key(key)
+
+    action_masks = []
+    for sp in range(STARTING_SP + 1):
+        mask = 0
+        for key, ability in abilities.items():
+            if sp >= ability.cost:
+                mask |= ABILITY_BITS[key]
+        action_masks.append(mask)
+
+    return ClassRules(definition['name'], definition['sprite'],
+                      definition['defense'], abilities, tuple(action_masks))
+
+
+RULES = {key: compile_class(definition)
+         for key, definition in CLASS_DEFINITIONS.items()}
+
+# Maps Character.style to the key of the class's rules
+STYLE_KEYS = {rules.name: key for key, rules in RULES.items()}
+
+
+# A game state is (p1 HP, p2 HP, p1 SP, p2 SP, queue), where queue is a tuple
+# of player indices (0 for P1, 1 for P2), front first. The player at the
+# front of the queue is the one to move.
+def initial_state() -> tuple:
+    """
+    Return the state every game starts in.
+
+    >>> initial_state()
+    (100, 100, 100, 100, (0, 1))
+    """
+    return (STARTING_HP, STARTING_HP, STARTING_SP, STARTING_SP, (0, 1))
+
+
+def legal_moves(matchup: tuple, state: tuple) -> list:
+    """
+    Return the moves the player to move in state can make, where matchup is
+    the (P1, P2) pair of ClassRules.
+
+    >>> legal_moves((RULES['m'], RULES['r']), (100, 100, 10, 100, (0, 1)))
+    ['A']
+    """
+    current = state[4][0]
+    return list(MASK_ACTIONS[matchup[current].action_masks[state[2 + current]]])
+
+
+def apply_move(matchup: tuple, state: tuple, move: str) -> tuple:
+    """
+    Return the state after the player to move in state makes move, where
+    matchup is the (P1, P2) pair of ClassRules. This applies the move's
+    Ability just as Character.perform() does, then removes the mover from
+    the front of the queue.
+
+    >>> matchup = (RULES['r'], RULES['m'])
+    >>> apply_move(matchup, initial_state(), 'S')
+    (100, 88, 90, 100, (1, 0, 0))
+    """
+    hp = [state[0], state[1]]
+    sp = [state[2], state[3]]
+    queue = state[4]
+    current = queue[0]
+    enemy = 1 - current
+    ability = matchup[current].abilities[move]
+    added = tuple(current if who == 'self' else enemy
+                  for who in ability.queue)
+
+    hp[enemy] = max(0, hp[enemy] - ability.damage + matchup[enemy].defense)
+    sp[current] = max(0, sp[current] - ability.cost)
+    return (hp[0], hp[1], sp[0], sp[1], queue[1:] + added)
+
+
+def state_winner(state: tuple) -> int:
+    """
+    Return the index of the player who has won in state (0 for P1, 1 for
+    P2), or None if nobody has.
+
+    >>> state_winner((0, 5, 0, 0, (0,)))
+    1
+    """
+    if state[0] == 0:
+        return 1
+    if state[1] == 0:
+        return 0
+    return None
+
+
+def reachable_states(matchup: tuple, start: tuple = None) -> list:
+    """
+    Return every state that can be reached from start (the opening position
+    by default) in the matchup, including start and finished states.
+
+    >>> len(reachable_states((RULES['m'], RULES['m'])))
+    911
+    """
+    if start is None:
+        start = initial_state()
+
+    seen = {start}
+    to_visit = [start]
+    while to_visit:
+        state = to_visit.pop()
+        if state_winner(state) is not None:
+            continue
+        for move in legal_moves(matchup, state):
+            next_state = apply_move(matchup, state, move)
+            if next_state not in seen:
+                seen.add(next_state)
+                to_visit.append(next_state)
+    return list(seen)
@@ -0,0 +1,181 @@
+"""
+Time-limited game-tree search for A1.
+
+ExpectimaxSearch picks a move for the player to move by searching the game
+tree over compact state tuples (see a1_rules) cloned from the live match.
+The opponent's turns are chance nodes averaging over their legal moves if
+they play at random, or min nodes if they might play well.
+
+The search deepens one ply at a time until it runs out of its per-move time
+budget and plays the best move of the deepest search that finished, so it
+never holds up the caller for longer than the budget. Evaluated states are
+cached across moves, and states whose whole subtree has been searched are
+cached as exact, so later moves in a match get faster and deeper.
+"""
+import time
+from typing import Dict, Tuple
+
+from a1_rules import apply_move, legal_moves, state_winner
+from a1_solver import encode_state
+
+# The value of a win for the searching player, and how much each turn
+# discounts a value so nearer wins are preferred
+WIN = 1000.0
+DISCOUNT = 0.999
+
+# How long one move may be searched for, in seconds
+DEFAULT_TIME_BUDGET = 0.01
+
+# The deepest search tried; deeper than any game can last
+MAX_DEPTH = 200
+
+# Cache depth of states whose whole subtree has been searched
+EXACT = MAX_DEPTH + 1
+
+# How many nodes are searched between checks of the clock
+CLOCK_CHECK_INTERVAL = 256
+
+
+class _OutOfTime(Exception):
+    """
+    Raised inside a search when its time budget runs out.
+    """
+    pass
+
+
+class ExpectimaxSearch:
+    """
+    An iterative deepening expectimax/minimax search.
+
+    Player 0 in every state is the player the search is choosing moves for.
+
+    time_budget - the most seconds one call to choose() may take
+    nodes_searched - how many nodes have been searched in total
+    search_time - how many seconds have been spent searching in total
+    last_depth - the depth of the last finished search
+    """
+    time_budget: float
+    nodes_searched: int
+    search_time: float
+    last_depth: int
+    _cache: Dict[tuple, Tuple[int, float]]
+
+    def __init__(self, time_budget: float = DEFAULT_TIME_BUDGET) -> None:
+        """
+        Initialize this ExpectimaxSearch with an empty cache.
+        """
+        self.time_budget = time_budget
+        self.nodes_searched = 0
+        self.search_time = 0.0
+        self.last_depth = 0
+        self._cache = {}
+        self._matchup = None
+        self._chance = False
+        self._deadline = 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        """
+        Return how many nodes this search has searched per second.
+        """
+        if not self.search_time:
+            return 0.0
+        return self.nodes_searched / self.search_time
+
+    def choose(self, matchup: tuple, state: tuple, chance: bool) -> str:
+        """
+        Return the best move found within the time budget for player 0 in
+        state, or 'X' if player 0 has no move. matchup is the (player 0,
+        player 1) pair of ClassRules, and chance is whether player 1 plays
+        at random.
+
+        >>> from a1_rules import RULES, initial_state
+        >>> search = ExpectimaxSearch(0.05)
+        >>> search.choose((RULES['r'], RULES['m']), initial_state(), True)
+        'S'
+        """
+        moves = legal_moves(matchup, state)
+        if not moves:
+            return 'X'
+        if len(moves) == 1:
+            return moves[0]
+
+        # Cached values are only valid for the same matchup and opponent
+        if (matchup, chance) != (self._matchup, self._chance):
+            self._cache = {}
+            self._matchup, self._chance = matchup, chance
+
+        start = time.perf_counter()
+        self._deadline = start + self.time_budget
+        best_move = moves[0]
+        try:
+            for depth in range(1, MAX_DEPTH + 1):
+                best_value, exact = None, True
+                for move in moves:
+                    value, move_exact = self._search(
+                        apply_move(matchup, state, move), depth - 1)
+                    exact = exact and move_exact
+                    if best_value is None or value > best_value:
+                        best_value, depth_best = value, move
+                best_move = depth_best
+                self.last_depth = depth
+                if exact:
+                    break
+        except _OutOfTime:
+            pass
+
+        self.search_time += time.perf_counter() - start
+        return best_move
+
+    def _search(self, state: tuple, depth: int) -> Tuple[float, bool]:
+        """
+        Return (value, exact) of state searched depth plies deep, where
+        exact is whether the value didn't depend on the depth limit.
+        """
+        self.nodes_searched += 1
+        if (self.nodes_searched % CLOCK_CHECK_INTERVAL == 0 and
+                time.perf_counter() > self._deadline):
+            raise _OutOfTime
+
+        key = encode_state(state)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] >= depth:
+            return entry[1], entry[0] == EXACT
+
+        winner = state_winner(state)
+        moves = legal_moves(self._matchup, state)
+        exact = True
+        if winner is not None:
+            value = WIN if winner == 0 else -WIN
+        elif not moves:
+            # Nobody can make the game go on; a tie
+            value = 0.0
+        elif depth == 0:
+            value = _evaluate(state)
+            exact = False
+        else:
+            values = []
+            for move in moves:
+                child_value, child_exact = self._search(
+                    apply_move(self._matchup, state, move), depth - 1)
+                values.append(child_value)
+                exact = exact and child_exact
+
+            if state[4][0] == 0:
+                value = max(values)
+            elif self._chance:
+                value = sum(values) / len(values)
+            else:
+                value = min(values)
+            value *= DISCOUNT
+
+        self._cache[key] = (EXACT if exact else depth, value)
+        return value, exact
+
+
+def _evaluate(state: tuple) -> float:
+    """
+    Return a heuristic value of an unfinished state for player 0: the HP
+    lead, with the SP lead as a tie-breaker.
+    """
+    return (state[0] - state[1]) + (state[2] - state[3]) / 100
@@ -0,0 +1,324 @@
+"""
+An asyncio match server for A1.
+
+Hosts many live two-player battles from a single process. Clients connect
+over TCP or a Unix socket and speak newline-delimited JSON:
+
+    client -> server   {"class": "m", "name": "alice"}    once, to join
+    server -> client   {"type": "start", "player": "p1"}  once paired
+    client -> server   "A" or "S"                         a move, as a line
+    server -> client   {"type": "state", ...}             after every move
+
+A state message has the same keys as a1_game.update_ui(), plus 'game_over'
+and 'winner' (the winner's name, or None). Clients are paired in the order
+they join, and each match runs in its own task around a GameSession.
+
+Backpressure: each match reads moves from a bounded queue, so a client that
+sends faster than its match can process stops being read from, and the
+match waits for both clients to drain their state updates before taking the
+next move. Matches and clients waiting for an opponent are closed after
+IDLE_TIMEOUT seconds without a move.
+
+Run this file to start a server:
+    python a1_server.py --port 8765
+and a1_load_test.py to measure it.
+"""
+import argparse
+import asyncio
+import json
+from typing import List, Union
+
+from a1_game import CHARACTER_CLASSES
+from a1_playstyle import ManualPlaystyle
+from a1_session import GameSession
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Seconds a match (or a client waiting to be paired) may go without a move
+IDLE_TIMEOUT = 30.0
+
+# The most unprocessed moves a match holds before it stops reading sockets
+MOVE_QUEUE_SIZE = 16
+
+
+class Player:
+    """
+    A client connected to the server.
+
+    reader, writer - the client's connection
+    character_class - a key of CHARACTER_CLASSES
+    name - the client's character name
+    match - set to the Match the client is placed in
+    """
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    character_class: str
+    name: str
+    match: 'asyncio.Future'
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, character_class: str,
+                 name: str) -> None:
+        """
+        Initialize this Player.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.character_class = character_class
+        self.name = name
+        self.match = asyncio.get_running_loop().create_future()
+
+    def send(self, message: dict) -> None:
+        """
+        Queue message to be sent to this client. Call drain() to wait for it
+        to be sent.
+        """
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b'\n')
+
+    async def drain(self) -> None:
+        """
+        Wait until this client's outgoing buffer has room again.
+        """
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    def is_connected(self) -> bool:
+        """
+        Return whether this client's connection is still open. A client that
+        hung up is only noticed once everything it sent has been read.
+        """
+        return not (self.writer.is_closing() or self.reader.at_eof())
+
+    def close(self) -> None:
+        """
+        Close the connection to this client.
+        """
+        self.writer.close()
+
+
+class Match:
+    """
+    A live match between two connected Players.
+
+    players - the players, P1 first
+    session - the GameSession being played
+    moves - (player index, move) pairs waiting to be applied. A move of None
+            means that player disconnected.
+    finished - whether this match has stopped taking moves
+    """
+    players: List[Player]
+    session: GameSession
+    moves: asyncio.Queue
+    finished: bool
+
+    def __init__(self, p1: Player, p2: Player) -> None:
+        """
+        Initialize this Match between p1 and p2.
+        """
+        self.players = [p1, p2]
+        self.session = GameSession(CHARACTER_CLASSES[p1.character_class],
+                                   CHARACTER_CLASSES[p2.character_class],
+                                   ManualPlaystyle, ManualPlaystyle,
+                                   p1.name, p2.name)
+        self.moves = asyncio.Queue(MOVE_QUEUE_SIZE)
+        self.finished = False
+
+    def state(self) -> dict:
+        """
+        Return the state message for this match.
+        """
+        state = self.session.update_ui()
+        winner = self.session.game_winner
+        state['type'] = 'state'
+        state['game_over'] = self.session.game_is_over
+        state['winner'] = winner.get_name() if winner else None
+        return state
+
+    async def broadcast(self, message: dict) -> None:
+        """
+        Send message to both players and wait for it to be sent.
+        """
+        for player in self.players:
+            player.send(message)
+        for player in self.players:
+            await player.drain()
+
+    async def run(self, idle_timeout: float) -> None:
+        """
+        Play this match until it is over, a player leaves or nobody moves
+        for idle_timeout seconds.
+        """
+        characters = [self.session.p1, self.session.p2]
+        for index, player in enumerate(self.players):
+            player.send({'type': 'start', 'player': 'p{}'.format(index + 1)})
+        await self.broadcast(self.state())
+
+        try:
+            while not self.session.game_is_over:
+                try:
+                    index, move = await asyncio.wait_for(self.moves.get(),
+                                                         idle_timeout)
+                except asyncio.TimeoutError:
+                    await self.broadcast({'type': 'timeout'})
+                    return
+
+                if move is None:
+                    await self.broadcast({'type': 'left',
+                                          'player': 'p{}'.format(index + 1)})
+                    return
+
+                if self.session.battle_queue.peek() is not characters[index]:
+                    self.players[index].send({'type': 'error',
+                                              'message': 'not your turn'})
+                    await self.players[index].drain()
+                    continue
+
+                self.session.perform_attack(move)
+                await self.broadcast(self.state())
+        finally:
+            self.finished = True
+            # Free any reader still waiting to put a move on the full queue
+            while not self.moves.empty():
+                self.moves.get_nowait()
+            for player in self.players:
+                player.close()
+
+
+class MatchServer:
+    """
+    Pairs connecting clients into matches and runs them.
+
+    idle_timeout - seconds without a move before a match or a waiting client
+                   is closed
+    matches_started, matches_finished - how many matches have been played
+    """
+    idle_timeout: float
+    matches_started: int
+    matches_finished: int
+    _waiting: Union[Player, None]
+    _tasks: set
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT) -> None:
+        """
+        Initialize this MatchServer.
+        """
+        self.idle_timeout = idle_timeout
+        self.matches_started = 0
+        self.matches_finished = 0
+        self._waiting = None
+        self._tasks = set()
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one client from joining until its match ends.
+        """
+        try:
+            line = await asyncio.wait_for(reader.readline(),
+                                          self.idle_timeout)
+            hello = json.loads(line)
+            if hello.get('class') not in CHARACTER_CLASSES:
+                raise ValueError('unknown class')
+        except (asyncio.TimeoutError, ConnectionError, ValueError,
+                AttributeError, TypeError):
+            writer.close()
+            return
+
+        player = Player(reader, writer, hello['class'],
+                        str(hello.get('name', 'Player')))
+        if self._waiting is not None and not self._waiting.is_connected():
+            # The waiting client hung up; let it go rather than pair with it
+            self._waiting.match.set_result(None)
+            self._waiting = None
+        if self._waiting is None:
+            self._waiting = player
+            try:
+                match = await asyncio.wait_for(asyncio.shield(player.match),
+                                               self.idle_timeout)
+            except asyncio.TimeoutError:
+                match = None
+            if match is None:
+                if self._waiting is player:
+                    self._waiting = None
+                player.close()
+                return
+        else:
+            match = Match(self._waiting, player)
+            self._waiting.match.set_result(match)
+            self._waiting = None
+            task = asyncio.create_task(self._run_match(match))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        await self._read_moves(player, match, match.players.index(player))
+
+    async def _run_match(self, match: Match) -> None:
+        """
+        Run match, keeping count of matches started and finished.
+        """
+        self.matches_started += 1
+        await match.run(self.idle_timeout)
+        self.matches_finished += 1
+
+    async def _read_moves(self, player: Player, match: Match,
+                          index: int) -> None:
+        """
+        Pass moves from player to match until the connection closes, or
+        the player sends something that isn't a line of text, which is
+        treated the same way. Waiting on a full move queue stops reading
+        from the socket, which pushes back on a client that sends too fast.
+        """
+        try:
+            while not match.finished:
+                line = await player.reader.readline()
+                if not line:
+                    break
+                await match.moves.put((index, line.decode().strip().upper()))
+        except (ConnectionError, ValueError):
+            # ValueError covers undecodable bytes and overlong lines
+            pass
+        if not match.finished:
+            await match.moves.put((index, None))
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                unix_path: str = None,
+                idle_timeout: float = IDLE_TIMEOUT) -> None:
+    """
+    Run a MatchServer on a TCP port, or on a Unix socket at unix_path if one
+    is given, until cancelled.
+    """
+    server = MatchServer(idle_timeout)
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle_client,
+                                                   unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host,
+                                              port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main() -> None:
+    """
+    Start a match server from the command line.
+    """
+    parser = argparse.ArgumentParser(description='A1 match server')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='listen on this Unix socket path')
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.idle_timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
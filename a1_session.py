@@ -0,0 +1,174 @@
+"""
+The GameSession class for A1.
+
+A GameSession owns everything about one match: its battle queue, both
+characters, the last key pressed and whether the game is over. Sessions
+share no state, so any number of them can live side by side in a process
+and be stepped from threads, other processes or an event loop.
+
+a1_game keeps its module-level functions as a thin wrapper around a single
+default session.
+"""
+import time
+from typing import Any, Union
+
+import a1_metrics
+from a1_animation import AnimationController
+from a1_battle_queue import BattleQueue
+from a1_rng import BatchedRandom
+
+
+class GameSession:
+    """
+    A single match between two characters.
+
+    battle_queue - the BattleQueue for this match
+    p1, p2 - the two characters
+    last_key_pressed - the key a manual player's playstyle will be given
+    game_is_over - whether the match is over
+    game_winner - the character that won, or None if the match isn't over
+                  or ended in a tie
+    turns - how many moves have been made
+    animation - chooses the characters' frames when update_ui is given a
+                time
+    recorder - the ReplayRecorder logging this match's moves, or None
+    rng - the random source shared by both playstyles
+    """
+    battle_queue: BattleQueue
+    p1: 'Character'
+    p2: 'Character'
+    last_key_pressed: str
+    game_is_over: bool
+    game_winner: Union['Character', None]
+    turns: int
+    animation: AnimationController
+    recorder: Union['ReplayRecorder', None]
+    rng: BatchedRandom
+
+    def __init__(self, p1_class: type, p2_class: type, p1_playstyle: type,
+                 p2_playstyle: type, p1_name: str = 'P1',
+                 p2_name: str = 'P2', seed: int = None) -> None:
+        """
+        Set up a new match between a p1_class called p1_name and a p2_class
+        called p2_name, using instances of the given Playstyle classes.
+        Both playstyles draw random decisions from this match's rng, seeded
+        with seed, so two matches with the same seed play out the same.
+
+        >>> from a1_characters import Mage, Rogue
+        >>> from a1_playstyle import RandomPlaystyle
+        >>> session = GameSession(Mage, Rogue, RandomPlaystyle,
+        ...                       RandomPlaystyle)
+        >>> session.battle_queue.peek() is session.p1
+        True
+        """
+        self.battle_queue = BattleQueue()
+        self.p1 = p1_class(p1_name, self.battle_queue,
+                           p1_playstyle(self.battle_queue))
+        self.p2 = p2_class(p2_name, self.battle_queue,
+                           p2_playstyle(self.battle_queue))
+        self.rng = BatchedRandom(seed)
+        self.p1.playstyle.rng = self.rng
+        self.p2.playstyle.rng = self.rng
+
+        # Set the enemy attribute of the characters before any attacks
+        self.p1.enemy = self.p2
+        self.p2.enemy = self.p1
+
+        self.battle_queue.add(self.p1)
+        self.battle_queue.add(self.p2)
+
+        self.last_key_pressed = None
+        self.game_is_over = self.battle_queue.is_over()
+        self.game_winner = None
+        self.turns = 0
+        self.animation = AnimationController()
+        self.recorder = None
+
+    def perform_attack(self, key: Any = None) -> bool:
+        """
+        Use the next character's playstyle to decide on and perform an
+        attack. Return whether a valid move was made.
+
+        If key is given, it is recorded as the last key pressed first.
+
+        >>> from a1_characters import Rogue
+        >>> from a1_playstyle import ManualPlaystyle
+        >>> session = GameSession(Rogue, Rogue, ManualPlaystyle,
+        ...                       ManualPlaystyle)
+        >>> session.perform_attack('S')
+        True
+        >>> session.p2.get_hp()
+        90
+        >>> session.perform_attack('X')
+        False
+        """
+        if key is not None:
+            self.last_key_pressed = key
+
+        # Only timed when metrics are being collected (see a1_metrics)
+        metrics = a1_metrics.ENABLED
+        if metrics:
+            start = time.perf_counter()
+
+        # Get the next character in the battle queue, but don't remove them.
+        next_character = self.battle_queue.peek()
+        playstyle = next_character.playstyle
+
+        # Uses the next character's playstyle to select an attack
+        if playstyle.is_manual:
+            move_to_make = playstyle.select_attack(self.last_key_pressed)
+        else:
+            move_to_make = playstyle.select_attack()
+        if metrics:
+            decided = time.perf_counter()
+
+        # 'A' represents a normal attack, 'S' represents a special attack.
+        valid = next_character.is_valid_action(move_to_make)
+        if valid:
+            if move_to_make == 'A':
+                next_character.attack()
+            else:
+                next_character.special_attack()
+
+            self.battle_queue.remove()
+            self.turns += 1
+            if self.recorder is not None:
+                self.recorder.record(move_to_make)
+
+        was_over = self.game_is_over
+        self.game_is_over = self.battle_queue.is_over()
+        self.game_winner = self.battle_queue.get_winner()
+        if metrics:
+            a1_metrics.record_turn(self, playstyle, (decided - start) * 1000,
+                                   (time.perf_counter() - start) * 1000,
+                                   valid, was_over)
+        return valid
+
+    def update_ui(self, now: float = None) -> dict:
+        """
+        Return the parameters to update the UI for this match.
+
+        If now (a time in milliseconds) is given, the sprites are integer
+        frame handles chosen by elapsed time (see a1_animation). Otherwise
+        they are frame names, and each call moves the animations forward
+        one frame.
+        """
+        if now is None:
+            p1_current_sprite = self.p1.get_next_sprite()
+            p2_current_sprite = self.p2.get_next_sprite()
+        else:
+            p1_current_sprite = self.animation.frame(self.p1, now)
+            p2_current_sprite = self.animation.frame(self.p2, now)
+
+        current_player = self.battle_queue.peek()
+
+        return {'p1_sprite': p1_current_sprite,
+                'p2_sprite': p2_current_sprite,
+                'p1_hp': self.p1.get_hp(),
+                'p2_hp': self.p2.get_hp(),
+                'p1_sp': self.p1.get_sp(),
+                'p2_sp': self.p2.get_sp(),
+                'p1_name': self.p1.get_name(),
+                'p2_name': self.p2.get_name(),
+                'actions': current_player.get_available_actions(),
+                'current_player': current_player.get_name()}
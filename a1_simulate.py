@@ -0,0 +1,190 @@
+"""
+The headless simulation engine for A1.
+
+Plays matches between two characters to completion without pygame or
+input(), as fast as the CPU allows. This is what balance testing and bot
+evaluation should use instead of driving a1_ui.py.
+
+Run this file to simulate a batch of matches and report the throughput:
+    python a1_simulate.py m r r r --matches 10000 --seed 1
+"""
+import argparse
+import time
+from typing import List
+
+import a1_metrics
+from a1_game import CHARACTER_CLASSES, PLAYSTYLE_CLASSES, create_session
+from a1_replay import ReplayRecorder
+
+# A match that runs for this many turns without ending is considered stalled
+MAX_TURNS = 10000
+
+
+class MatchSpec:
+    """
+    A description of a single headless match.
+
+    p1_class, p2_class - keys into CHARACTER_CLASSES ('m' or 'r')
+    p1_playstyle, p2_playstyle - keys into PLAYSTYLE_CLASSES
+    seed - the seed for the match's random source, or None for no seeding
+    """
+    p1_class: str
+    p2_class: str
+    p1_playstyle: str
+    p2_playstyle: str
+    seed: int
+
+    def __init__(self, p1_class: str, p2_class: str, p1_playstyle: str = 'r',
+                 p2_playstyle: str = 'r', seed: int = None) -> None:
+        """
+        Initialize this MatchSpec.
+
+        >>> spec = MatchSpec('m', 'r', seed=1)
+        >>> spec.p1_playstyle
+        'r'
+        """
+        self.p1_class = p1_class
+        self.p2_class = p2_class
+        self.p1_playstyle = p1_playstyle
+        self.p2_playstyle = p2_playstyle
+        self.seed = seed
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of this MatchSpec.
+
+        >>> MatchSpec('m', 'r', seed=1)
+        MatchSpec('m', 'r', 'r', 'r', seed=1)
+        """
+        return 'MatchSpec({!r}, {!r}, {!r}, {!r}, seed={!r})'.format(
+            self.p1_class, self.p2_class, self.p1_playstyle,
+            self.p2_playstyle, self.seed)
+
+
+def play_match(spec: MatchSpec, recorder: 'ReplayRecorder' = None) -> dict:
+    """
+    Play the match described by spec to completion and return its result.
+    If recorder is given, the match is recorded with it (see a1_replay).
+
+    The result has the same flavour as a1_game.update_ui(): 'winner' is 'p1',
+    'p2' or None for a tie, 'turns' is the number of actions performed, and
+    'p1_hp', 'p1_sp', 'p2_hp', 'p2_sp' are the final values. 'stalled' is
+    True if the match stopped because nobody could act. 'nodes_searched' and
+    'search_time' (seconds) total the work of any SearchPlaystyles.
+
+    >>> result = play_match(MatchSpec('m', 'm', seed=3))
+    >>> result['winner'] in ('p1', 'p2')
+    True
+    """
+    session = create_session(spec.p1_class, spec.p2_class, spec.p1_playstyle,
+                             spec.p2_playstyle, seed=spec.seed)
+    p1, p2 = session.p1, session.p2
+    if p1.playstyle.is_manual or p2.playstyle.is_manual:
+        raise ValueError('Manual playstyles cannot be simulated headless')
+    if recorder is not None:
+        recorder.begin(session, spec.seed)
+
+    stalled = False
+    while not session.game_is_over:
+        # An AI that can't find a valid move will never find one, since
+        # nothing changes until somebody acts
+        if not session.perform_attack() or session.turns >= MAX_TURNS:
+            stalled = True
+            break
+    if recorder is not None:
+        recorder.end()
+
+    searches = [character.playstyle.search for character in (p1, p2)
+                if hasattr(character.playstyle, 'search')]
+    nodes_searched = sum(search.nodes_searched for search in searches)
+    if a1_metrics.ENABLED and nodes_searched:
+        a1_metrics.counter('search.nodes').add(nodes_searched)
+
+    winner = None if stalled else session.game_winner
+    return {'winner': 'p1' if winner is p1 else 'p2' if winner is p2 else None,
+            'turns': session.turns,
+            'stalled': stalled,
+            'p1_hp': p1.get_hp(),
+            'p1_sp': p1.get_sp(),
+            'p2_hp': p2.get_hp(),
+            'p2_sp': p2.get_sp(),
+            'nodes_searched': nodes_searched,
+            'search_time': sum(search.search_time for search in searches)}
+
+
+def run_matches(specs: List[MatchSpec],
+                recorder: 'ReplayRecorder' = None) -> dict:
+    """
+    Play every match in specs and return the results together with the
+    throughput of the engine. If recorder is given, every match is recorded
+    with it.
+
+    The returned dict has 'results' (one play_match() result per spec, in
+    order), 'elapsed' (seconds) and 'matches_per_second'.
+
+    >>> report = run_matches([MatchSpec('r', 'r', seed=s) for s in range(5)])
+    >>> len(report['results'])
+    5
+    """
+    start = time.perf_counter()
+    results = [play_match(spec, recorder) for spec in specs]
+    elapsed = time.perf_counter() - start
+
+    return {'results': results,
+            'elapsed': elapsed,
+            'matches_per_second': len(specs) / elapsed if elapsed else 0.0}
+
+
+def main() -> None:
+    """
+    Simulate a batch of identical matches from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Headless A1 simulation')
+    parser.add_argument('p1_class', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('p2_class', choices=sorted(CHARACTER_CLASSES))
+    parser.add_argument('p1_playstyle', nargs='?', default='r',
+                        choices=sorted(PLAYSTYLE_CLASSES))
+    parser.add_argument('p2_playstyle', nargs='?', default='r',
+                        choices=sorted(PLAYSTYLE_CLASSES))
+    parser.add_argument('--matches', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first match; match i uses seed + i')
+    parser.add_argument('--record', metavar='PATH',
+                        help='append every match to this replay log')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="collect metrics and dump them to PATH ('-' "
+                             "for stderr) on exit or SIGUSR1")
+    args = parser.parse_args()
+    if args.metrics:
+        a1_metrics.enable(args.metrics)
+
+    specs = [MatchSpec(args.p1_class, args.p2_class, args.p1_playstyle,
+                       args.p2_playstyle, seed=args.seed + i)
+             for i in range(args.matches)]
+    recorder = ReplayRecorder() if args.record else None
+    report = run_matches(specs, recorder)
+    if recorder is not None:
+        recorder.write(args.record)
+
+    wins = {'p1': 0, 'p2': 0, None: 0}
+    turns = 0
+    nodes_searched = 0
+    search_time = 0.0
+    for result in report['results']:
+        wins[result['winner']] += 1
+        turns += result['turns']
+        nodes_searched += result['nodes_searched']
+        search_time += result['search_time']
+
+    print('{} matches in {:.3f}s ({:.0f} matches/s)'.format(
+        args.matches, report['elapsed'], report['matches_per_second']))
+    print('P1 wins: {}  P2 wins: {}  Ties: {}  Mean turns: {:.2f}'.format(
+        wins['p1'], wins['p2'], wins[None], turns / max(1, args.matches)))
+    if nodes_searched:
+        print('Search: {} nodes in {:.3f}s ({:.0f} nodes/s)'.format(
+            nodes_searched, search_time,
+            nodes_searched / search_time if search_time else 0.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+An exact solver for A1.
+
+A match's whole state is two HP values, two SP values and the battle queue,
+so the game can be solved exactly. Solver searches every line of play from a
+position and memoizes each state it solves in a transposition table keyed
+by a canonical encoding of the state, so positions reached by different
+move orders are only solved once.
+
+Values are from P1's point of view: a win for P1 is positive, a win for P2
+negative and a tie 0. Wins are worth WIN minus the number of turns needed,
+so optimal play wins as fast as possible and loses as slowly as possible.
+
+Run this file to solve every class matchup from the opening position:
+    python a1_solver.py
+"""
+import time
+from typing import Dict, Tuple
+
+from a1_rules import RULES, apply_move, initial_state, legal_moves, \
+    state_winner
+
+WIN = 1000
+
+
+def encode_state(state: tuple) -> tuple:
+    """
+    Return the canonical encoding of state used as a transposition table
+    key: the HPs and SPs, and the queue packed into an int (a leading 1 bit
+    followed by one bit per turn, front first).
+
+    >>> encode_state((100, 90, 70, 100, (1, 0, 0)))
+    (100, 90, 70, 100, 12)
+    """
+    packed = 1
+    for player in state[4]:
+        packed = (packed << 1) | player
+    return state[0], state[1], state[2], state[3], packed
+
+
+def state_from_characters(p1: 'Character', p2: 'Character') -> tuple:
+    """
+    Return the state of the live match between p1 and p2 (see a1_rules).
+    """
+    queue = tuple(0 if character is p1 else 1
+                  for character in p1.battle_queue.queue)
+    return p1.get_hp(), p2.get_hp(), p1.get_sp(), p2.get_sp(), queue
+
+
+class Solver:
+    """
+    Solves one class matchup exactly.
+
+    p1_class, p2_class - keys of a1_rules.RULES
+    table - the transposition table, mapping encoded states to (value, best
+            move). The best move is None in finished states.
+    visited - how many states have been searched (including cache hits)
+    cache_hits - how many of those were answered from the table
+    """
+    p1_class: str
+    p2_class: str
+    table: Dict[tuple, Tuple[int, str]]
+    visited: int
+    cache_hits: int
+
+    def __init__(self, p1_class: str, p2_class: str) -> None:
+        """
+        Initialize this Solver with an empty transposition table.
+        """
+        self.p1_class = p1_class
+        self.p2_class = p2_class
+        self._matchup = (RULES[p1_class], RULES[p2_class])
+        self.table = {}
+        self.visited = 0
+        self.cache_hits = 0
+
+    def solve(self, state: tuple = None) -> Tuple[int, str]:
+        """
+        Return (value, best move) for the player to move in state, which
+        defaults to the opening position.
+
+        >>> value, move = Solver('r', 'm').solve()
+        >>> value > 0
+        True
+        """
+        if state is None:
+            state = initial_state()
+        return self._solve(state)
+
+    def _solve(self, state: tuple) -> Tuple[int, str]:
+        """
+        Return (value, best move) for state, searching and filling in the
+        table as needed.
+        """
+        self.visited += 1
+        key = encode_state(state)
+        entry = self.table.get(key)
+        if entry is not None:
+            self.cache_hits += 1
+            return entry
+
+        winner = state_winner(state)
+        moves = legal_moves(self._matchup, state)
+        if winner is not None:
+            entry = (WIN if winner == 0 else -WIN, None)
+        elif not moves:
+            # The player to move can never act again, so the game can't go
+            # on; count it as a tie
+            entry = (0, None)
+        else:
+            maximizing = state[4][0] == 0
+            best_value, best_move = None, None
+            for move in moves:
+                value = self._solve(apply_move(self._matchup, state, move))[0]
+                if (best_value is None or
+                        (value > best_value if maximizing
+                         else value < best_value)):
+                    best_value, best_move = value, move
+
+            # A win or loss one turn further away is worth one point less
+            if best_value > 0:
+                best_value -= 1
+            elif best_value < 0:
+                best_value += 1
+            entry = (best_value, best_move)
+
+        self.table[key] = entry
+        return entry
+
+    def best_move(self, state: tuple) -> str:
+        """
+        Return the optimal move for the player to move in state, or None if
+        the game is over.
+        """
+        return self._solve(state)[1]
+
+
+def main() -> None:
+    """
+    Solve every class matchup from the opening position.
+    """
+    for p1_class in sorted(RULES):
+        for p2_class in sorted(RULES):
+            solver = Solver(p1_class, p2_class)
+            start = time.perf_counter()
+            value, move = solver.solve()
+            elapsed = time.perf_counter() - start
+
+            if value > 0:
+                outcome = 'P1 wins in {} turns'.format(WIN - value)
+            elif value < 0:
+                outcome = 'P2 wins in {} turns'.format(WIN + value)
+            else:
+                outcome = 'tie'
+            print('{} vs {}: {}, opening move {} ({} states, {} visits, '
+                  '{} cache hits, {:.3f}s)'.format(
+                      p1_class, p2_class, outcome, move, len(solver.table),
+                      solver.visited, solver.cache_hits, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+A packed sprite atlas for the A1 UI.
+
+Decoding the .png files is most of the UI's asset startup. Running this file
+packs every character frame (facing both ways) and the background into one
+atlas file, as raw pixels already in the format of a 32-bit display:
+    python a1_sprite_atlas.py
+
+SpriteAtlas memory-maps that file and creates every surface directly over
+the mapped pixels, so opening it decodes and copies nothing, and every game
+process on a host using the same file shares one page-cached copy. The map
+is copy-on-write, so a surface drawn onto would only copy the pages it
+touched; the UI never draws onto sprites. Rebuild the atlas after changing
+the sprites.
+
+File format (little-endian):
+    header       magic b'A1SA', version (u16), number of images (u16),
+                 pixel format (4 bytes, e.g. b'BGRA')
+    index        per image: name (ASCII, NUL-padded), width, height (u16
+                 each), pitch in bytes (u32), offset of the pixels (u64)
+    pixels       each image's rows, top to bottom, at its offset
+
+Images are stored in a1_animation.FRAME_NAMES order, each frame followed by
+its flipped copy, and then the background.
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from typing import List, Tuple
+
+import pygame
+
+from a1_animation import FRAME_NAMES
+from a1_sprite_cache import BACKGROUND, SPRITE_DIRECTORY, SpriteCache
+
+DEFAULT_ATLAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'a1_sprites.atlas')
+
+MAGIC = b'A1SA'
+VERSION = 1
+HEADER = struct.Struct('<4sHH4s')
+ENTRY = struct.Struct('<24sHHIQ')
+
+# The byte order of each pixel: that of a 32-bit display, with the alpha
+# byte where the display leaves padding
+PIXEL_FORMAT = 'BGRA'
+
+# Images start on a multiple of this many bytes in the file
+ALIGNMENT = 64
+
+# The suffix of a flipped frame's name in the index
+FLIPPED = ':flipped'
+
+
+def _align(offset: int) -> int:
+    """
+    Return offset rounded up to the next multiple of ALIGNMENT.
+
+    >>> _align(1), _align(64), _align(65)
+    (64, 64, 128)
+    """
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _images(directory: str) -> List[Tuple[str, 'pygame.Surface']]:
+    """
+    Return every (name, surface) to pack from the sprites in directory, in
+    atlas order.
+    """
+    cache = SpriteCache(directory)
+    cache.load()
+    images = []
+    for frame, name in enumerate(FRAME_NAMES):
+        images.append((name, cache.get(frame)))
+        images.append((name + FLIPPED, cache.get(frame, flipped=True)))
+    images.append((BACKGROUND, cache.background()))
+    return images
+
+
+def build(path: str = DEFAULT_ATLAS_PATH,
+          directory: str = SPRITE_DIRECTORY) -> None:
+    """
+    Pack every frame and the background in directory into an atlas file
+    at path.
+    """
+    images = _images(directory)
+    index = []
+    blobs = []
+    offset = _align(HEADER.size + ENTRY.size * len(images))
+    for name, surface in images:
+        width, height = surface.get_size()
+        pixels = pygame.image.tobytes(surface, PIXEL_FORMAT)
+        index.append(ENTRY.pack(name.encode('ascii'), width, height,
+                                len(pixels) // height, offset))
+        blobs.append((offset, pixels))
+        offset = _align(offset + len(pixels))
+
+    with open(path, 'wb') as atlas_file:
+        atlas_file.write(HEADER.pack(MAGIC, VERSION, len(images),
+                                     PIXEL_FORMAT.encode('ascii')))
+        atlas_file.write(b''.join(index))
+        for blob_offset, blob in blobs:
+            atlas_file.write(b'\0' * (blob_offset - atlas_file.tell()))
+            atlas_file.write(blob)
+
+
+class SpriteAtlas:
+    """
+    A memory-mapped sprite atlas.
+
+    path - the file that was mapped
+    pixel_format - the byte order of its pixels, e.g. 'BGRA'
+    frames - a (surface, flipped surface) pair per frame handle
+    """
+    path: str
+    pixel_format: str
+    frames: List[Tuple['pygame.Surface', 'pygame.Surface']]
+    _background: 'pygame.Surface'
+
+    def __init__(self, path: str = DEFAULT_ATLAS_PATH) -> None:
+        """
+        Map the atlas file at path and create a surface over each image in
+        it.
+        """
+        self.path = path
+        with open(path, 'rb') as atlas_file:
+            self._map = mmap.mmap(atlas_file.fileno(), 0,
+                                  access=mmap.ACCESS_COPY)
+        view = memoryview(self._map)
+
+        magic, version, count, pixel_format = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a version {} sprite atlas'.format(
+                path, VERSION))
+        if count != 2 * len(FRAME_NAMES) + 1:
+            raise ValueError('{} has {} images, not the {} of these sprites; '
+                             'rebuild it'.format(path, count,
+                                                 2 * len(FRAME_NAMES) + 1))
+        self.pixel_format = pixel_format.decode('ascii')
+
+        surfaces = []
+        for i in range(count):
+            _, width, height, pitch, offset = ENTRY.unpack_from(
+                self._map, HEADER.size + i * ENTRY.size)
+            surfaces.append(pygame.image.frombuffer(
+                view[offset:offset + pitch * height], (width, height),
+                self.pixel_format, pitch))
+        self.frames = list(zip(surfaces[0:-1:2], surfaces[1:-1:2]))
+
+        # The background is opaque; drop its per-pixel alpha (without
+        # copying) so it is blitted without blending
+        self._background = surfaces[-1]
+        self._background.set_alpha(None)
+
+    def background(self) -> 'pygame.Surface':
+        """
+        Return the background.
+        """
+        return self._background
+
+
+def main() -> None:
+    """
+    Build the sprite atlas from the command line, and compare opening it
+    with decoding the .png files.
+    """
+    parser = argparse.ArgumentParser(description='Build the A1 sprite atlas')
+    parser.add_argument('--output', default=DEFAULT_ATLAS_PATH)
+    parser.add_argument('--sprites', default=SPRITE_DIRECTORY,
+                        help='the directory holding the .png files')
+    args = parser.parse_args()
+    pygame.init()
+
+    start = time.perf_counter()
+    build(args.output, args.sprites)
+    print('Wrote {} ({} bytes) in {:.3f}s'.format(
+        args.output, os.path.getsize(args.output),
+        time.perf_counter() - start))
+
+    start = time.perf_counter()
+    SpriteCache(args.sprites).load()
+    print('Decoding the .png files: {:.2f} ms'.format(
+        (time.perf_counter() - start) * 1000))
+    start = time.perf_counter()
+    SpriteAtlas(args.output)
+    print('Mapping the atlas:       {:.2f} ms'.format(
+        (time.perf_counter() - start) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+The sprite cache for the A1 UI.
+
+Every character frame and the background are decoded from disk once and
+kept in memory in both orientations (P2 is drawn flipped so they face P1).
+Drawing a frame is then a list lookup: the render loop does no file I/O,
+image decoding or flipping.
+
+Frames can be loaded all at once with load(), or streamed: load_first()
+decodes the background and the frames needed for the first screen, and
+load_rest_in_background() decodes every other frame on a background
+thread. Until a frame has arrived, get() returns a placeholder: the first
+frame loaded for the same character, or a blank surface. The loader thread
+only decodes; surfaces are converted to the display format on the main
+thread the first time they are drawn. load_atlas() instead takes every
+surface from a memory-mapped a1_sprite_atlas.SpriteAtlas, which needs no
+decoding, and whose surfaces are used as they are when already in the
+display's format.
+
+Frames are stored in a list in a1_animation.FRAME_NAMES order, so they are
+looked up by frame handle.
+"""
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple, Union
+
+import pygame
+
+from a1_animation import FRAME_NAMES
+
+# The .png files sit next to this module, wherever the game is run from
+SPRITE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND = 'background'
+
+
+class SpriteCache:
+    """
+    A cache of decoded sprite surfaces.
+
+    directory - the directory the .png files are loaded from
+    load_started - when loading started (time.perf_counter()), or None
+    first_loaded - when the first frames were ready to draw, or None
+    fully_loaded - when every frame had been decoded, or None
+    """
+    directory: str
+    load_started: Union[float, None]
+    first_loaded: Union[float, None]
+    fully_loaded: Union[float, None]
+    _frames: List[Union[Tuple['pygame.Surface', 'pygame.Surface'], None]]
+    _decoded: Dict[int, Tuple['pygame.Surface', 'pygame.Surface']]
+    _placeholders: Dict[str, int]
+    _background: 'pygame.Surface'
+
+    def __init__(self, directory: str = SPRITE_DIRECTORY) -> None:
+        """
+        Initialize this SpriteCache. Nothing is loaded until load() or
+        load_first() is called.
+        """
+        self.directory = directory
+        self.load_started = None
+        self.first_loaded = None
+        self.fully_loaded = None
+        self._frames = [None] * len(FRAME_NAMES)
+        self._decoded = {}
+        self._placeholders = {}
+        self._blank = None
+        self._background = None
+        self._atlas = None
+        self._convert = False
+        self._loaded = threading.Event()
+
+    def _load_image(self, name: str) -> 'pygame.Surface':
+        """
+        Decode the image called name from this cache's directory.
+        """
+        return pygame.image.load(os.path.join(self.directory, name + '.png'))
+
+    def _load_frame(self, frame: int) -> Tuple['pygame.Surface',
+                                               'pygame.Surface']:
+        """
+        Decode the frame with handle frame and return it and a flipped copy.
+        """
+        surface = self._load_image(FRAME_NAMES[frame])
+        return surface, pygame.transform.flip(surface, True, False)
+
+    def load(self) -> None:
+        """
+        Decode every character frame and the background, and prepare a
+        flipped copy of every frame.
+        """
+        self.load_started = time.perf_counter()
+        self._frames = [self._load_frame(frame)
+                        for frame in range(len(FRAME_NAMES))]
+        self._background = self._load_image(BACKGROUND)
+        self.first_loaded = self.fully_loaded = time.perf_counter()
+        self._loaded.set()
+
+    def load_atlas(self, atlas: 'SpriteAtlas') -> None:
+        """
+        Use every frame and the background of atlas.
+        """
+        self.load_started = time.perf_counter()
+        self._atlas = atlas
+        self._frames = list(atlas.frames)
+        self._background = atlas.background()
+        self.first_loaded = self.fully_loaded = time.perf_counter()
+        self._loaded.set()
+
+    def load_first(self, frames: Iterable[int]) -> None:
+        """
+        Decode the background and the frames with the given handles now,
+        and use the first frame of each character as its placeholder.
+        """
+        self.load_started = time.perf_counter()
+        self._background = self._load_image(BACKGROUND)
+        for frame in frames:
+            self._frames[frame] = self._load_frame(frame)
+            self._placeholders.setdefault(_sprite_of(frame), frame)
+        self.first_loaded = time.perf_counter()
+
+    def load_rest_in_background(self) -> threading.Thread:
+        """
+        Start decoding every frame not loaded yet on a daemon thread, the
+        frames of characters with placeholders first, and return the
+        thread.
+        """
+        remaining = sorted((frame for frame in range(len(FRAME_NAMES))
+                            if self._frames[frame] is None),
+                           key=lambda frame: (_sprite_of(frame) not in
+                                              self._placeholders, frame))
+
+        def load_remaining() -> None:
+            """
+            Decode the remaining frames.
+            """
+            for frame in remaining:
+                self._decoded[frame] = self._load_frame(frame)
+            self.fully_loaded = time.perf_counter()
+            self._loaded.set()
+
+        loader = threading.Thread(target=load_remaining, name='sprite-loader',
+                                  daemon=True)
+        loader.start()
+        return loader
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait until every frame has been decoded, for at most timeout
+        seconds, and return whether they have been.
+        """
+        return self._loaded.wait(timeout)
+
+    def convert(self) -> None:
+        """
+        Convert every cached surface to the pixel format of the display so
+        blitting them doesn't need a conversion each frame. Frames that
+        arrive later are converted when they are first drawn.
+
+        Must be called after pygame.display.set_mode().
+        """
+        self._convert = True
+        self._frames = [_convert_pair(pair) if pair is not None else None
+                        for pair in self._frames]
+        self._background = _to_display_format(self._background)
+
+    def is_ready(self, frame: int) -> bool:
+        """
+        Return whether the frame with handle frame has been decoded, so
+        get() won't return a placeholder for it.
+        """
+        return self._frames[frame] is not None or frame in self._decoded
+
+    def get(self, frame: int, flipped: bool = False) -> 'pygame.Surface':
+        """
+        Return the cached frame with handle frame, facing left instead of
+        right if flipped is True, or a placeholder if it hasn't been
+        decoded yet.
+        """
+        pair = self._frames[frame]
+        if pair is None:
+            pair = self._decoded.pop(frame, None)
+            if pair is None:
+                return self._placeholder(frame)[flipped]
+            if self._convert:
+                pair = _convert_pair(pair)
+            self._frames[frame] = pair
+        return pair[flipped]
+
+    def _placeholder(self, frame: int) -> Tuple['pygame.Surface',
+                                                'pygame.Surface']:
+        """
+        Return the placeholder pair for the frame with handle frame: the
+        first frame loaded of the same character, or else a blank surface.
+        """
+        placeholder = self._placeholders.get(_sprite_of(frame))
+        if placeholder is not None:
+            return self._frames[placeholder]
+        if self._blank is None:
+            size = next((loaded[0].get_size() for loaded in self._frames
+                         if loaded is not None), (1, 1))
+            blank = pygame.Surface(size, pygame.SRCALPHA)
+            self._blank = (blank, blank)
+        return self._blank
+
+    def background(self) -> 'pygame.Surface':
+        """
+        Return the cached background.
+        """
+        return self._background
+
+
+def _sprite_of(frame: int) -> str:
+    """
+    Return the name of the character the frame with handle frame is of.
+
+    >>> _sprite_of(0)
+    'mage'
+    """
+    return FRAME_NAMES[frame].split('_', 1)[0]
+
+
+def _convert_pair(pair: Tuple['pygame.Surface', 'pygame.Surface']
+                  ) -> Tuple['pygame.Surface', 'pygame.Surface']:
+    """
+    Return a copy of a (surface, flipped surface) pair in the display's
+    pixel format.
+    """
+    return _to_display_format(pair[0]), _to_display_format(pair[1])
+
+
+def _to_display_format(surface: 'pygame.Surface') -> 'pygame.Surface':
+    """
+    Return surface in the display's pixel format, keeping per-pixel alpha
+    if it has any: surface itself if it already is, or else a copy.
+    """
+    display = pygame.display.get_surface()
+    if (surface.get_bitsize() == display.get_bitsize() and
+            surface.get_masks()[:3] == display.get_masks()[:3]):
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
@@ -0,0 +1,105 @@
+"""
+Startup time of the A1 modules.
+
+Imports each module in a fresh interpreter with -X importtime and reports
+the module's cumulative import time, the interpreter's wall-clock time, and
+whether pygame was imported along the way. The game logic should import
+without pygame; only opening a window (a1_ui.open_display) should load it.
+
+Run this file to measure, optionally writing the results as JSON:
+    python a1_startup.py --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# The modules measured by default. The game logic ones must not import
+# pygame.
+GAME_LOGIC_MODULES = ['a1_battle_queue', 'a1_characters', 'a1_playstyle',
+                      'a1_game']
+MODULES = GAME_LOGIC_MODULES + ['a1_simulate', 'a1_ui']
+
+REPEAT = 5
+
+
+def measure_import(module: str) -> Dict[str, object]:
+    """
+    Import module in a new interpreter and return its cumulative import
+    time and the interpreter's wall-clock time (both in milliseconds), and
+    whether pygame was imported.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=directory, capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - start) * 1000
+
+    # Lines look like "import time:  self [us] | cumulative | name", with
+    # the name indented by how deeply it was imported
+    cumulative = None
+    imported = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        imported.add(name)
+        if name == module:
+            cumulative = int(fields[1]) / 1000
+    return {'import_ms': cumulative, 'wall_ms': wall,
+            'pygame': 'pygame' in imported}
+
+
+def measure(modules: List[str], repeat: int = REPEAT) -> Dict[str, dict]:
+    """
+    Return the best of repeat measurements of each module in modules.
+    """
+    results = {}
+    for module in modules:
+        runs = [measure_import(module) for _ in range(repeat)]
+        results[module] = {
+            'import_ms': min(run['import_ms'] for run in runs),
+            'wall_ms': min(run['wall_ms'] for run in runs),
+            'pygame': any(run['pygame'] for run in runs)}
+    return results
+
+
+def main() -> None:
+    """
+    Measure startup from the command line. Exits with status 1 if a game
+    logic module imports pygame.
+    """
+    parser = argparse.ArgumentParser(description='Measure A1 startup time')
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', metavar='PATH',
+                        help='write the results as JSON to PATH')
+    args = parser.parse_args()
+
+    results = measure(args.modules, args.repeat)
+    for module, result in results.items():
+        print('{:20} import {:7.2f} ms  interpreter {:7.2f} ms  {}'.format(
+            module, result['import_ms'], result['wall_ms'],
+            'imports pygame' if result['pygame'] else 'no pygame'))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'python': sys.version.split()[0], 'results': results},
+                      output, indent=2)
+
+    offenders = [module for module in GAME_LOGIC_MODULES
+                 if results.get(module, {}).get('pygame')]
+    if offenders:
+        print('Game logic imports pygame: {}'.format(', '.join(offenders)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+The text surface cache for the A1 UI.
+
+Rendering a line of text with pygame.font is expensive compared to blitting
+the result, and the HUD shows the same few lines for many frames in a row.
+TextCache creates each font once and keeps rendered lines keyed by
+(text, color, size), evicting the least recently used line when full.
+"""
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import pygame
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class TextCache:
+    """
+    A least recently used cache of rendered text surfaces.
+
+    max_entries - the most rendered lines kept at once
+    hits, misses - how many render() calls were answered from the cache and
+                   how many had to render
+    """
+    max_entries: int
+    hits: int
+    misses: int
+    _fonts: Dict[int, 'pygame.font.Font']
+    _surfaces: 'OrderedDict[Tuple[str, tuple, int], pygame.Surface]'
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        """
+        Initialize this TextCache.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fonts = {}
+        self._surfaces = OrderedDict()
+
+    def font(self, size: int) -> 'pygame.font.Font':
+        """
+        Return the default font at size, creating it on first use.
+        """
+        font = self._fonts.get(size)
+        if font is None:
+            font = pygame.font.SysFont(pygame.font.get_default_font(), size)
+            self._fonts[size] = font
+        return font
+
+    def render(self, text: str, color: tuple, size: int) -> 'pygame.Surface':
+        """
+        Return text rendered (antialiased) in color at size.
+        """
+        key = (text, color, size)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.font(size).render(text, True, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_entries:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self) -> None:
+        """
+        Forget every rendered line (but keep the fonts).
+        """
+        self._surfaces.clear()
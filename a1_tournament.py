@@ -0,0 +1,170 @@
+"""
+A round-robin tournament runner for A1.
+
+Every combination of a class in CHARACTER_CLASSES and a non-manual playstyle
+in PLAYSTYLE_CLASSES plays every other (and itself), once as P1 and once as
+P2, for a number of seeded games per pairing. Time-limited playstyles (the
+search) are left out unless asked for, since their moves, and so the
+results, can't be reproduced from the seeds. Games are split into chunks
+and spread across a ProcessPoolExecutor, so the tournament uses every core.
+The results are reduced into a win-rate matrix.
+
+Run this file to play a tournament:
+    python a1_tournament.py --games 10000
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from a1_game import CHARACTER_CLASSES, PLAYSTYLE_CLASSES
+from a1_simulate import MatchSpec, play_match
+
+# How many games of one pairing make up a unit of work for a worker
+DEFAULT_CHUNK_SIZE = 500
+
+
+def entrants(time_limited: bool = False) -> List[Tuple[str, str]]:
+    """
+    Return every (class key, playstyle key) that can play headless, i.e.
+    every class with every non-manual playstyle, leaving out time-limited
+    playstyles unless time_limited is True.
+
+    >>> ('m', 'r') in entrants()
+    True
+    >>> ('m', 'm') in entrants()
+    False
+    >>> ('m', 's') in entrants(), ('m', 's') in entrants(time_limited=True)
+    (False, True)
+    """
+    return [(character, playstyle)
+            for character in sorted(CHARACTER_CLASSES)
+            for playstyle in sorted(PLAYSTYLE_CLASSES)
+            if not PLAYSTYLE_CLASSES[playstyle].is_manual and
+            (time_limited or
+             not PLAYSTYLE_CLASSES[playstyle].is_time_limited)]
+
+
+def play_chunk(chunk: tuple) -> dict:
+    """
+    Play one unit of work: (p1 entrant, p2 entrant, first seed, games).
+    Return the outcome counts along with the id of the worker process and
+    the time it spent.
+    """
+    p1, p2, first_seed, games = chunk
+    start = time.perf_counter()
+    wins = {'p1': 0, 'p2': 0, None: 0}
+    for seed in range(first_seed, first_seed + games):
+        spec = MatchSpec(p1[0], p2[0], p1[1], p2[1], seed=seed)
+        wins[play_match(spec)['winner']] += 1
+
+    return {'p1': p1,
+            'p2': p2,
+            'p1_wins': wins['p1'],
+            'p2_wins': wins['p2'],
+            'ties': wins[None],
+            'games': games,
+            'worker': os.getpid(),
+            'elapsed': time.perf_counter() - start}
+
+
+def make_chunks(players: List[Tuple[str, str]], games: int,
+                chunk_size: int) -> List[tuple]:
+    """
+    Split games games of every ordered pairing of players into units of at
+    most chunk_size games. Pairing i uses seeds i * games onwards.
+
+    >>> len(make_chunks([('m', 'r'), ('r', 'r')], 10, 4))
+    12
+    """
+    chunks = []
+    pairings = [(p1, p2) for p1 in players for p2 in players]
+    for index, (p1, p2) in enumerate(pairings):
+        for offset in range(0, games, chunk_size):
+            chunks.append((p1, p2, index * games + offset,
+                           min(chunk_size, games - offset)))
+    return chunks
+
+
+def run_tournament(games: int, workers: int = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   time_limited: bool = False) -> dict:
+    """
+    Play games games of every ordered pairing of entrants(time_limited)
+    across workers processes (all cores by default).
+
+    Return 'players' (the entrants), 'win_rates' (win_rates[i][j] is the
+    rate at which players[i] as P1 beats players[j] as P2), 'workers' (games
+    played, busy seconds and games per second for each worker process),
+    'games' and 'elapsed' (wall-clock seconds).
+    """
+    players = entrants(time_limited)
+    index = {player: i for i, player in enumerate(players)}
+    wins = [[0] * len(players) for _ in players]
+    played = [[0] * len(players) for _ in players]
+    worker_stats = {}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(play_chunk,
+                                   make_chunks(players, games, chunk_size)):
+            i, j = index[result['p1']], index[result['p2']]
+            wins[i][j] += result['p1_wins']
+            played[i][j] += result['games']
+
+            stats = worker_stats.setdefault(result['worker'],
+                                            {'games': 0, 'elapsed': 0.0})
+            stats['games'] += result['games']
+            stats['elapsed'] += result['elapsed']
+    elapsed = time.perf_counter() - start
+
+    for stats in worker_stats.values():
+        stats['games_per_second'] = (stats['games'] / stats['elapsed']
+                                     if stats['elapsed'] else 0.0)
+
+    return {'players': players,
+            'win_rates': [[wins[i][j] / played[i][j] if played[i][j] else 0.0
+                           for j in range(len(players))]
+                          for i in range(len(players))],
+            'workers': worker_stats,
+            'games': sum(map(sum, played)),
+            'elapsed': elapsed}
+
+
+def main() -> None:
+    """
+    Run a tournament from the command line and print the win-rate matrix.
+    """
+    parser = argparse.ArgumentParser(description='A1 round-robin tournament')
+    parser.add_argument('--games', type=int, default=1000,
+                        help='games per ordered pairing')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--time-limited', action='store_true',
+                        help='also enter time-limited playstyles (search), '
+                             'whose results the seeds do not reproduce')
+    args = parser.parse_args()
+
+    report = run_tournament(args.games, args.workers, args.chunk_size,
+                            args.time_limited)
+    names = ['{}/{}'.format(*player) for player in report['players']]
+
+    print('P1 win rate (row as P1 vs column as P2):')
+    print('      ' + ''.join('{:>8}'.format(name) for name in names))
+    for name, row in zip(names, report['win_rates']):
+        print('{:>6}'.format(name) +
+              ''.join('{:>8.3f}'.format(rate) for rate in row))
+
+    print()
+    for pid, stats in sorted(report['workers'].items()):
+        print('Worker {}: {} games, {:.0f} games/s'.format(
+            pid, stats['games'], stats['games_per_second']))
+    print('{} games in {:.3f}s wall-clock ({:.0f} games/s)'.format(
+        report['games'], report['elapsed'],
+        report['games'] / report['elapsed'] if report['elapsed'] else 0.0))
+
+
+if __name__ == '__main__':
+    main()
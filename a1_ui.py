@@ -8,11 +8,23 @@ This file simply calls on pygame and the code from a1_game.py, which contains
 all of your client code.
 """
 import a1_game
-import pygame
+import a1_metrics
+import argparse
+import os
 import sys
+import time
+from a1_animation import frame_handle
+from a1_replay import ReplayRecorder
 
-GAME_SPEED = 100
-pygame.init()
+# How many frames to draw per second, and how many milliseconds a
+# non-manual player waits before making each move
+TARGET_FPS = 60
+AI_DECISION_INTERVAL = 1000
+
+# pygame, and the caches that need it, are only loaded by load_pygame() when
+# the window is opened, so importing this module (or running it with --help)
+# doesn't pay for starting pygame
+pygame = None
 
 PYGAME_SCREEN = None
 CHARACTER_SIZE = 120
@@ -20,15 +32,72 @@ NUMBER_OF_CHARACTERS = 2
 PADDING = 40
 P1_POSITION = CHARACTER_SIZE // 4
 P2_POSITION = CHARACTER_SIZE - (CHARACTER_SIZE // 4)
-RANDOM_TIMER = 10
 FONT_SIZE = 18
+SPRITES = None
+TEXT = None
+
+# The sprite atlas built by a1_sprite_atlas.py; the .png files are decoded
+# instead if it hasn't been built. Pass --sprite-atlas to use another.
+SPRITE_ATLAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'a1_sprites.atlas')
+SpriteAtlas = None
+TEXT_COLOR = (0, 0, 0)
+
+# The lines last drawn in each block of the HUD, and their rendered surfaces
+HUD_BLOCKS = {}
+
+# Redraw only the regions of the screen that changed each frame, instead of
+# the whole screen. Use --dirty-rects on the command line to turn it on.
+DIRTY_RECT_RENDERING = False
+
+# The (name, content, rect) of every region in the last frame drawn
+LAST_DRAWN = []
+
+# When open_display() was called and when the first frame was shown
+# (time.perf_counter()), for reporting time-to-first-frame
+DISPLAY_OPENED = None
+FIRST_FRAME_SHOWN = None
+
+# Milliseconds from each key press being received to the frame showing its
+# result reaching the display
+INPUT_LATENCIES = []
+
+# Maps pygame key codes to moves; filled in by load_pygame()
+KEY_MOVES = {}
+
+def load_pygame():
+    """
+    Import and start pygame, and create the caches that use it, if that
+    hasn't been done yet.
+    """
+    global pygame, SPRITES, TEXT, SpriteAtlas
+    if pygame is not None:
+        return
+    
+    import pygame
+    from a1_sprite_atlas import SpriteAtlas
+    from a1_sprite_cache import SpriteCache
+    from a1_text_cache import TextCache
+    
+    pygame.init()
+    SPRITES = SpriteCache()
+    TEXT = TextCache()
+    KEY_MOVES.update({pygame.K_a: 'A', pygame.K_s: 'S'})
 
 def start_game():
     """
     Start and initialize the game
     """
-    global PYGAME_SCREEN, CHARACTER_SIZE, NUMBER_OF_CHARACTERS, FONT_SIZE
     a1_game.set_up_game()
+    open_display()
+
+def open_display():
+    """
+    Open the game window and load everything drawing it needs.
+    """
+    global PYGAME_SCREEN, DISPLAY_OPENED
+    DISPLAY_OPENED = time.perf_counter()
+    load_pygame()
     
     # Set up the width and height of the screen (proportional to the character
     # sizes)
@@ -39,15 +108,59 @@ def start_game():
     
     # set the screen to draw on
     PYGAME_SCREEN = pygame.display.set_mode(pixel_size)
+    
+    # Map every frame from the sprite atlas if an up to date one has been
+    # built. Otherwise decode the pose each character starts in and the
+    # background first, so the first frame can be drawn straight away, and
+    # stream every other frame in on a background thread
+    atlas = None
+    if os.path.exists(SPRITE_ATLAS_PATH):
+        try:
+            atlas = SpriteAtlas(SPRITE_ATLAS_PATH)
+        except ValueError as error:
+            print('Not using the sprite atlas: {}'.format(error))
+    if atlas is not None:
+        SPRITES.load_atlas(atlas)
+        SPRITES.convert()
+    else:
+        SPRITES.load_first([frame_handle(character.sprite, 
+                                         character.last_animation[0], 0)
+                            for character in (a1_game.P1, a1_game.P2)])
+        SPRITES.convert()
+        SPRITES.load_rest_in_background()
+    
+    # Create the HUD font once, rather than every frame
+    TEXT.font(FONT_SIZE)
+    
+def render_label(block, lines):
+    """
+    Return the rendered lines of text for the HUD block called block.
+    
+    The lines are only re-rendered when they differ from the ones last drawn
+    in that block, which is most frames between turns.
+    """
+    drawn = HUD_BLOCKS.get(block)
+    if drawn is None or drawn[0] != lines:
+        drawn = (lines, [TEXT.render(line, TEXT_COLOR, FONT_SIZE) 
+                         for line in lines])
+        HUD_BLOCKS[block] = drawn
+    return drawn[1]
 
-def update_game():
+def label_blits(surfaces, x, y):
     """
-    Update the game's UI.
+    Return (surface, position) pairs that stack surfaces one line apart,
+    starting at (x, y).
+    """
+    return [(surface, (x, y + i * FONT_SIZE)) 
+            for i, surface in enumerate(surfaces)]
+
+def build_regions(draw_parameters):
+    """
+    Return the regions of the screen to draw for draw_parameters, in the
+    order they are drawn, as (name, content, blits) triples. content is what
+    the region shows, so a region only needs redrawing when it changes, and
+    blits are the (surface, position) pairs that draw it.
     """
-    global PYGAME_SCREEN, CHARACTER_SIZE, P1_POSITION, P2_POSITION
-    
-    draw_parameters = a1_game.update_ui()
-    
     p1_sprite = draw_parameters['p1_sprite']
     p1_hp = draw_parameters['p1_hp']
     p1_sp = draw_parameters['p1_sp']
@@ -62,44 +175,30 @@ def update_game():
     
     p2_label = "{}\nHP: {}\nSP: {}".format(p2_name, p2_hp, p2_sp).split("\n")
     
-    font_type = pygame.font.get_default_font()
-    font = pygame.font.SysFont(font_type, FONT_SIZE)
+    p1_icon = SPRITES.get(p1_sprite)
+    # Flip p2 so they face p1
+    p2_icon = SPRITES.get(p2_sprite, flipped=True)
     
-    p1_icon = pygame.image.load('sprites/' + p1_sprite + '.png')
-    p2_icon = pygame.image.load('sprites/' + p2_sprite + '.png')
-
-    PYGAME_SCREEN.fill((255, 255, 255)) # (255, 255, 255)=(r,g,b)=white
-    bg = pygame.image.load('sprites/background.png')
-    rect = pygame.Rect(0, 0, NUMBER_OF_CHARACTERS * CHARACTER_SIZE,
-                       CHARACTER_SIZE + PADDING * 2)
-    PYGAME_SCREEN.blit(bg, rect)
+    # A sprite region also changes when its frame arrives from the loader
+    p1_sprite = (p1_sprite, SPRITES.is_ready(p1_sprite))
+    p2_sprite = (p2_sprite, SPRITES.is_ready(p2_sprite))
     
     # Draw the first character
-    (x, y) = P1_POSITION, PADDING
-    rect = pygame.Rect(x, y, CHARACTER_SIZE, CHARACTER_SIZE)
-    PYGAME_SCREEN.blit(p1_icon, rect)
-    
-    y_coordinate = 0
-    for line in p1_label:
-        text = font.render(line, True, (0, 0, 0))
-        PYGAME_SCREEN.blit(text, (P1_POSITION + PADDING, y_coordinate))
-        y_coordinate += FONT_SIZE
+    regions = [('p1_sprite', p1_sprite, 
+                [(p1_icon, (P1_POSITION, PADDING))]),
+               ('p1_label', p1_label, 
+                label_blits(render_label('p1', p1_label), 
+                            P1_POSITION + PADDING, 0))]
     
     # Draw the HP bar
     # Draw the SP bar
     
     # Draw the second character
-    # Flip p2 so they face p1
-    p2_icon = pygame.transform.flip(p2_icon, True, False)
-    (x, y) = P2_POSITION, PADDING
-    rect = pygame.Rect(x, y, CHARACTER_SIZE, CHARACTER_SIZE)
-    PYGAME_SCREEN.blit(p2_icon, rect)
-
-    y_coordinate = 0
-    for line in p2_label:
-        text = font.render(line, True, (0, 0, 0))
-        PYGAME_SCREEN.blit(text, (P2_POSITION + PADDING, y_coordinate))
-        y_coordinate += FONT_SIZE    
+    regions.append(('p2_sprite', p2_sprite, 
+                    [(p2_icon, (P2_POSITION, PADDING))]))
+    regions.append(('p2_label', p2_label, 
+                    label_blits(render_label('p2', p2_label), 
+                                P2_POSITION + PADDING, 0)))
     
     # Update the current player and available actions
     if not a1_game.GAME_IS_OVER:
@@ -107,53 +206,186 @@ def update_game():
         current_player = draw_parameters['current_player']
         action_label = ["Current Character: {}".format(current_player),
                         "Available Actions: {}".format(", ".join(actions))]
+        regions.append(('actions', action_label, 
+                        label_blits(render_label('actions', action_label),
+                                    P1_POSITION + PADDING // 2, 
+                                    CHARACTER_SIZE + PADDING)))
     
-        y_coordinate = CHARACTER_SIZE + PADDING
-        for line in action_label:
-            text = font.render(line, True, (0, 0, 0))
-            PYGAME_SCREEN.blit(text, (P1_POSITION + PADDING // 2, y_coordinate))
-            y_coordinate += FONT_SIZE
+    return regions
+
+def draw_regions(regions):
+    """
+    Draw the background and then every region onto the screen. Only the
+    pixels inside the screen's clipping rectangle are touched.
+    """
+    PYGAME_SCREEN.fill((255, 255, 255)) # (255, 255, 255)=(r,g,b)=white
+    PYGAME_SCREEN.blit(SPRITES.background(), (0, 0))
+    for _, _, blits in regions:
+        PYGAME_SCREEN.blits(blits, doreturn=False)
+
+def region_rect(blits):
+    """
+    Return the smallest rectangle covering every blit in blits.
+    """
+    rects = [surface.get_rect(topleft=position) 
+             for surface, position in blits]
+    return rects[0].unionall(rects[1:])
+
+def find_dirty_rects(regions):
+    """
+    Return the rectangles of the screen that differ from the last frame
+    drawn: where each changed region was, and where it is now.
+    """
+    dirty = []
+    drawn = {name: (content, rect) for name, content, rect in LAST_DRAWN}
+    for name, content, blits in regions:
+        rect = region_rect(blits)
+        last = drawn.pop(name, None)
+        if last is None:
+            dirty.append(rect)
+        elif last[0] != content or last[1] != rect:
+            dirty.append(rect.union(last[1]))
     
-    pygame.display.flip()
+    # Regions that are no longer drawn have to be painted over
+    dirty.extend(rect for _, rect in drawn.values())
+    
+    # Overlapping rectangles would be drawn and pushed twice
+    merged = []
+    for rect in dirty:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
 
-if __name__ == '__main__':
-    start_game()
+def update_game():
+    """
+    Update the game's UI.
+    
+    With DIRTY_RECT_RENDERING, only the regions of the screen that changed
+    since the last frame are redrawn and pushed to the display. Otherwise
+    the whole screen is redrawn and flipped.
+    """
+    global LAST_DRAWN
+    
+    regions = build_regions(a1_game.update_ui(pygame.time.get_ticks()))
+    
+    if DIRTY_RECT_RENDERING and LAST_DRAWN:
+        dirty_rects = find_dirty_rects(regions)
+        for rect in dirty_rects:
+            PYGAME_SCREEN.set_clip(rect)
+            draw_regions(regions)
+        PYGAME_SCREEN.set_clip(None)
+        pygame.display.update(dirty_rects)
+    else:
+        draw_regions(regions)
+        pygame.display.flip()
+    
+    LAST_DRAWN = [(name, content, region_rect(blits)) 
+                  for name, content, blits in regions]
+
+def handle_key(key):
+    """
+    Make the move for key if the current player is using a manual playstyle.
+    Return whether a move was attempted.
+    """
+    if (a1_game.BATTLE_QUEUE.is_over() or 
+        not a1_game.BATTLE_QUEUE.peek().playstyle.is_manual):
+        return False
+    
+    a1_game.LAST_KEY_PRESSED = KEY_MOVES.get(key, 'X')
+    a1_game.perform_attack()
+    return True
+
+def run_game(target_fps=TARGET_FPS, ai_interval=AI_DECISION_INTERVAL):
+    """
+    Run the game until it is over.
+    
+    Frames are drawn target_fps times a second, paced by a pygame Clock.
+    Between frames the loop sleeps in pygame.event.wait(), so a key press is
+    handled and drawn the moment it arrives rather than on the next frame.
+    Non-manual players make a move ai_interval milliseconds after the
+    previous move, independent of the frame rate.
+    """
+    global FIRST_FRAME_SHOWN
+    
+    clock = pygame.time.Clock()
+    frame_interval = 1000 / target_fps
     update_game()
+    if FIRST_FRAME_SHOWN is None:
+        FIRST_FRAME_SHOWN = time.perf_counter()
+    next_frame = pygame.time.get_ticks() + frame_interval
+    next_ai_decision = pygame.time.get_ticks() + ai_interval
     
     while not a1_game.GAME_IS_OVER:
-        pygame.time.wait(GAME_SPEED)
-        for event in pygame.event.get():
+        # Sleep until there's input, or until the next frame or AI move is
+        # due
+        now = pygame.time.get_ticks()
+        timeout = int(min(next_frame, next_ai_decision) - now)
+        event = pygame.event.wait(timeout) if timeout > 0 else \
+            pygame.event.poll()
+        
+        input_received = None
+        while event.type != pygame.NOEVENT:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit(0)
             if event.type == pygame.KEYDOWN:
-                # If the current player is using a manual playstyle, the
-                # pick a move when a key is pressed
-                if (not a1_game.BATTLE_QUEUE.is_over() and 
-                    a1_game.BATTLE_QUEUE.peek().playstyle.is_manual):
-                    k = 'X'
-                    if event.key == pygame.K_a:
-                        k = 'A'
-                    elif event.key == pygame.K_s:
-                        k = 'S'
-                        
-                    a1_game.LAST_KEY_PRESSED = k
-                    a1_game.perform_attack()
-                
+                # Latency is measured from when the key press is taken off
+                # the queue, so it includes making the move
+                received = time.perf_counter()
+                if handle_key(event.key):
+                    if input_received is None:
+                        input_received = received
+                    next_ai_decision = pygame.time.get_ticks() + ai_interval
+            event = pygame.event.poll()
+        
         # If the current player isn't using a manual playstyle, pick a move
-        if (not a1_game.BATTLE_QUEUE.is_over() and 
-            not a1_game.BATTLE_QUEUE.peek().playstyle.is_manual and
-            RANDOM_TIMER == 10):
+        now = pygame.time.get_ticks()
+        moved = input_received is not None
+        if (now >= next_ai_decision and not a1_game.BATTLE_QUEUE.is_over() and
+            not a1_game.BATTLE_QUEUE.peek().playstyle.is_manual):
             a1_game.perform_attack()
+            moved = True
+            next_ai_decision = now + ai_interval
+        elif now >= next_ai_decision:
+            # Waiting on a manual player; don't wake up again until later
+            next_ai_decision = now + ai_interval
         
-        # Redraw the game
-        update_game()
-        
-        # Only let the random strategy make a decision every 10 ticks of time
-        RANDOM_TIMER -= 1
-        if RANDOM_TIMER == 0:
-            RANDOM_TIMER = 10
-        
+        # Redraw the game as soon as a move is made, and otherwise once per
+        # frame
+        if moved or now >= next_frame:
+            update_game()
+            frame_time = clock.tick()
+            next_frame = max(next_frame + frame_interval, now)
+            if a1_metrics.ENABLED:
+                a1_metrics.histogram('frame.ms').observe(frame_time)
+            if input_received is not None:
+                INPUT_LATENCIES.append(
+                    (time.perf_counter() - input_received) * 1000)
+                if a1_metrics.ENABLED:
+                    a1_metrics.histogram('input_latency.ms').observe(
+                        INPUT_LATENCIES[-1])
+    
+    # Draw the final state, which also clears the actions panel for
+    # show_game_over()
+    update_game()
+
+def load_times():
+    """
+    Return the milliseconds from the window being opened to the first frame
+    being shown and to every sprite being loaded (None for any that hasn't
+    happened yet).
+    """
+    return {name: None if moment is None else (moment - DISPLAY_OPENED) * 1000
+            for name, moment in (('first_frame_ms', FIRST_FRAME_SHOWN),
+                                 ('fully_loaded_ms', SPRITES.fully_loaded))}
+
+def show_game_over():
+    """
+    Draw the result of the game over the action panel.
+    """
     game_label = ["Game over!"]
     winner = a1_game.GAME_WINNER
     if winner:
@@ -161,21 +393,62 @@ if __name__ == '__main__':
     else:
         game_label.append("The game ended in a tie!")
     
-    font_type = pygame.font.get_default_font()
-    font = pygame.font.SysFont(font_type, FONT_SIZE)
-    
     y_coordinate = CHARACTER_SIZE + PADDING
-    for line in game_label:
-        text = font.render(line, True, (0, 0, 0))
+    for text in render_label('actions', game_label):
         PYGAME_SCREEN.blit(text, (P1_POSITION + PADDING // 2, y_coordinate))
         y_coordinate += FONT_SIZE
         
     pygame.display.flip()
 
-    pygame.time.wait(1000)
-    pygame.quit()
-    sys.exit(0)        
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play A1')
+    parser.add_argument('--fps', type=int, default=TARGET_FPS,
+                        help='frames drawn per second')
+    parser.add_argument('--ai-interval', type=int, 
+                        default=AI_DECISION_INTERVAL,
+                        help='milliseconds between non-manual moves')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='only redraw the parts of the screen that change')
+    parser.add_argument('--record', metavar='PATH',
+                        help='append the match to this replay log')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="collect metrics and dump them to PATH ('-' "
+                             "for stderr) on exit or SIGUSR1")
+    parser.add_argument('--sprite-atlas', metavar='PATH', 
+                        default=SPRITE_ATLAS_PATH,
+                        help='the sprite atlas to map, if it exists')
+    args = parser.parse_args()
     
+    if args.metrics:
+        a1_metrics.enable(args.metrics)
+    DIRTY_RECT_RENDERING = args.dirty_rects
+    SPRITE_ATLAS_PATH = args.sprite_atlas
+    start_game()
+    
+    # Moves are only buffered in memory during the game; the log is written
+    # once it's over
+    recorder = ReplayRecorder() if args.record else None
+    if recorder is not None:
+        recorder.begin(a1_game.SESSION)
+    run_game(args.fps, args.ai_interval)
+    if recorder is not None:
+        recorder.write(args.record)
+    show_game_over()
+    
+    times = load_times()
+    print("Time to first frame: {:.1f} ms, to fully loaded: {}".format(
+        times['first_frame_ms'], 
+        '{:.1f} ms'.format(times['fully_loaded_ms']) 
+        if times['fully_loaded_ms'] is not None else 'not finished'))
+    if a1_metrics.ENABLED:
+        for name, value in times.items():
+            if value is not None:
+                a1_metrics.histogram('startup.' + name).observe(value)
     
+    if INPUT_LATENCIES:
+        print("Input-to-frame latency: mean {:.2f} ms, max {:.2f} ms".format(
+            sum(INPUT_LATENCIES) / len(INPUT_LATENCIES), max(INPUT_LATENCIES)))
 
-    
\ No newline at end of file
+    pygame.time.wait(1000)
+    pygame.quit()
+    sys.exit(0)